@@ -0,0 +1,41 @@
+"""book search
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 16:02:11.418276
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # Adding a stored generated column rewrites the table once to fill it for the existing books.
+    op.add_column('books', sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(author, '')), 'B') || "
+        "setweight(to_tsvector('english', coalesce(publisher, '')), 'C')",
+        persisted=True), nullable=True))
+    # Build the indexes without blocking writes to tables that are already populated.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_books_search_vector', 'books', ['search_vector'], unique=False, postgresql_using='gin', postgresql_concurrently=True)
+        op.create_index('ix_books_title_trgm', 'books', ['title'], unique=False, postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'}, postgresql_concurrently=True)
+        op.create_index('ix_books_author_trgm', 'books', ['author'], unique=False, postgresql_using='gin', postgresql_ops={'author': 'gin_trgm_ops'}, postgresql_concurrently=True)
+        op.create_index('ix_books_publisher_trgm', 'books', ['publisher'], unique=False, postgresql_using='gin', postgresql_ops={'publisher': 'gin_trgm_ops'}, postgresql_concurrently=True)
+
+
+def downgrade():
+    op.drop_index('ix_books_publisher_trgm', table_name='books', postgresql_using='gin', postgresql_ops={'publisher': 'gin_trgm_ops'})
+    op.drop_index('ix_books_author_trgm', table_name='books', postgresql_using='gin', postgresql_ops={'author': 'gin_trgm_ops'})
+    op.drop_index('ix_books_title_trgm', table_name='books', postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'})
+    op.drop_index('ix_books_search_vector', table_name='books', postgresql_using='gin')
+    op.drop_column('books', 'search_vector')
@@ -0,0 +1,100 @@
+"""partition borrow_records by month
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 18:31:40.285316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+COLUMNS = 'id, borrow_note, due_date, return_date, user_id, book_id, created_at, updated_at, is_archive'
+
+# One partition per month from the oldest loan (and at least a year back) to three months ahead.
+CREATE_PARTITIONS = """
+DO $$
+DECLARE
+    month date;
+BEGIN
+    FOR month IN SELECT generate_series(
+        date_trunc('month', least((SELECT min(created_at) FROM borrow_records_unpartitioned),
+                                  localtimestamp - interval '12 months')),
+        date_trunc('month', localtimestamp + interval '3 months'),
+        interval '1 month')::date
+    LOOP
+        EXECUTE 'CREATE TABLE ' || quote_ident('borrow_records_p' || to_char(month, 'YYYY_MM'))
+             || ' PARTITION OF borrow_records FOR VALUES FROM (' || quote_literal(month)
+             || ') TO (' || quote_literal((month + interval '1 month')::date) || ')';
+    END LOOP;
+END $$
+"""
+
+
+def create_indexes():
+    op.create_index('ix_borrow_records_book_id_created_at', 'borrow_records', ['book_id', 'created_at'], unique=False)
+    op.create_index('ix_borrow_records_created_at_id', 'borrow_records', ['created_at', 'id'], unique=False)
+    op.create_index('ix_borrow_records_due_date', 'borrow_records', ['due_date'], unique=False)
+    op.create_index('ix_borrow_records_open_loans', 'borrow_records', ['due_date'], unique=False, postgresql_where=sa.text('return_date IS NULL'))
+    op.create_index(op.f('ix_borrow_records_user_id'), 'borrow_records', ['user_id'], unique=False)
+
+
+def drop_indexes(table_name):
+    op.drop_index(op.f('ix_borrow_records_user_id'), table_name=table_name)
+    op.drop_index('ix_borrow_records_open_loans', table_name=table_name)
+    op.drop_index('ix_borrow_records_due_date', table_name=table_name)
+    op.drop_index('ix_borrow_records_created_at_id', table_name=table_name)
+    op.drop_index('ix_borrow_records_book_id_created_at', table_name=table_name)
+
+
+def create_borrow_records(partitioned: bool):
+    # The partition key is part of the primary key and can't be null.
+    op.create_table('borrow_records',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('borrow_records_id_seq'::regclass)"), nullable=False),
+    sa.Column('borrow_note', sa.Text(), nullable=True),
+    sa.Column('due_date', sa.Date(), nullable=True),
+    sa.Column('return_date', sa.Date(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('book_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=not partitioned),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('is_archive', sa.Boolean(), nullable=True),
+    sa.ForeignKeyConstraint(['book_id'], ['books.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', 'created_at') if partitioned else sa.PrimaryKeyConstraint('id'),
+    **({'postgresql_partition_by': 'RANGE (created_at)'} if partitioned else {})
+    )
+
+
+def upgrade():
+    # The loans are copied in this transaction, writes to borrow_records wait until it commits.
+    op.rename_table('borrow_records', 'borrow_records_unpartitioned')
+    op.execute('ALTER TABLE borrow_records_unpartitioned RENAME CONSTRAINT borrow_records_pkey TO borrow_records_unpartitioned_pkey')
+    drop_indexes('borrow_records_unpartitioned')
+
+    create_borrow_records(partitioned=True)
+    op.execute(CREATE_PARTITIONS)
+    op.execute('CREATE TABLE borrow_records_default PARTITION OF borrow_records DEFAULT')
+    op.execute(f"INSERT INTO borrow_records ({COLUMNS}) SELECT {COLUMNS.replace('created_at', 'coalesce(created_at, localtimestamp)', 1)} FROM borrow_records_unpartitioned")
+    op.execute('ALTER SEQUENCE borrow_records_id_seq OWNED BY borrow_records.id')
+    op.drop_table('borrow_records_unpartitioned')
+    create_indexes()
+
+
+def downgrade():
+    # Loans of detached partitions are not brought back.
+    op.rename_table('borrow_records', 'borrow_records_partitioned')
+    op.execute('ALTER TABLE borrow_records_partitioned RENAME CONSTRAINT borrow_records_pkey TO borrow_records_partitioned_pkey')
+    drop_indexes('borrow_records_partitioned')
+
+    create_borrow_records(partitioned=False)
+    op.execute(f'INSERT INTO borrow_records ({COLUMNS}) SELECT {COLUMNS} FROM borrow_records_partitioned')
+    op.execute('ALTER SEQUENCE borrow_records_id_seq OWNED BY borrow_records.id')
+    op.drop_table('borrow_records_partitioned')
+    create_indexes()
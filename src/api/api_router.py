@@ -1,5 +1,8 @@
 from fastapi import APIRouter
-from .endpoints import user_router
+from .endpoints import user_router, metrics_router, export_router, health_router
 
 api_router = APIRouter()
-api_router.include_router(user_router, prefix="/user", tags=["user"])
\ No newline at end of file
+api_router.include_router(user_router, prefix="/user", tags=["user"])
+api_router.include_router(metrics_router, prefix="/metrics", tags=["metrics"])
+api_router.include_router(export_router, prefix="/export", tags=["export"])
+api_router.include_router(health_router, tags=["health"])
@@ -1 +1,4 @@
-from .user import router as user_router
\ No newline at end of file
+from .user import router as user_router
+from .metrics import router as metrics_router
+from .export import router as export_router
+from .health import router as health_router
@@ -0,0 +1,93 @@
+import csv
+import io
+import logging
+from typing import AsyncIterator, List, Optional
+
+import orjson
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.future import select
+
+from config import settings
+from db import sessionmanager
+from gql.queries import ModelMapper
+from models import Book, BorrowRecord, stored_columns
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+async def stream_rows(query, export_format: str) -> AsyncIterator[bytes]:
+    """
+    Streams the rows of a select through a server-side cursor, yielding one encoded chunk per
+    EXPORT_CHUNK_SIZE rows so memory stays flat regardless of the size of the export.
+
+    Parameters:
+    - query: A column select (rows are never turned into ORM objects).
+    - export_format: "ndjson" or "csv"; CSV output starts with a header row.
+    """
+    columns = [str(column.name) for column in query.selected_columns]
+    if export_format == "csv":
+        yield _csv_chunk([columns])
+
+    async with sessionmanager.session(replica=True) as db:
+        result = await db.stream(query.execution_options(yield_per=settings.EXPORT_CHUNK_SIZE))
+        async for partition in result.partitions():
+            if export_format == "csv":
+                yield _csv_chunk(partition)
+            else:
+                yield b"".join(orjson.dumps(dict(zip(columns, row))) + b"\n" for row in partition)
+
+
+def _csv_chunk(rows) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode()
+
+
+def export_response(query, export_format: str, name: str) -> StreamingResponse:
+    return StreamingResponse(
+        stream_rows(query, export_format),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{export_format}"'},
+    )
+
+
+@router.get("/borrow-records/", name="export:borrow-records")
+async def export_borrow_records(
+        export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+        user_id_in: Optional[List[int]] = Query(None),
+        book_id_in: Optional[List[int]] = Query(None),
+):
+    """
+    Exports borrow records, filtered like the borrowsRecords query, as NDJSON or CSV.
+    """
+    params = {key: value for key, value in {"user_id_in": user_id_in, "book_id_in": book_id_in}.items()
+              if value is not None}
+    query = select(*BorrowRecord.__table__.columns).filter(
+        *ModelMapper.get_filter_exp(params, 'BORROW_MAPPER')
+    ).order_by(BorrowRecord.id)
+    return export_response(query, export_format, "borrow-records")
+
+
+@router.get("/books/", name="export:books")
+async def export_books(
+        export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+        author: Optional[str] = None,
+        title: Optional[str] = None,
+        id_in: Optional[List[int]] = Query(None),
+):
+    """
+    Exports books, filtered like the books query, as NDJSON or CSV.
+    """
+    params = {key: value for key, value in {"author": author, "title": title, "id_in": id_in}.items()
+              if value is not None}
+    query = select(*stored_columns(Book.__table__)).filter(
+        *ModelMapper.get_filter_exp(params, 'BOOK_MAPPER')
+    ).order_by(Book.id)
+    return export_response(query, export_format, "books")
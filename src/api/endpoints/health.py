@@ -0,0 +1,17 @@
+import logging
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.get("/healthz", name="health:readiness")
+async def readiness(request: Request):
+    """
+    Readiness probe. Answers 503 until the app has warmed up (mappers configured, schema validated,
+    pools and pub/sub started) and again once it is shutting down, 200 in between.
+    """
+    if getattr(request.app.state, "ready", False):
+        return {"status": "ready"}
+    return JSONResponse({"status": "starting"}, status_code=503)
@@ -0,0 +1,41 @@
+import logging
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from db import sessionmanager, compiled_cache_hit_rate
+from gql.cache import analytics_cache, document_cache, persisted_queries, statement_cache
+from gql.pubsub import broker
+from gql.response_cache import response_cache
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+def render_metrics(prefix: str, values: dict) -> str:
+    """
+    Renders a flat dict of numeric values in the Prometheus text exposition format.
+    """
+    lines = []
+    for name, value in values.items():
+        if isinstance(value, (int, float)):
+            lines.append(f"{prefix}_{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+@router.get("/", name="metrics:scrape", response_class=PlainTextResponse)
+async def metrics():
+    replicas = "".join(
+        render_metrics(f"db_replica_{index}", {**sessionmanager.pool_stats(replica.engine),
+                                               "healthy": int(replica.healthy), "lag_seconds": replica.lag})
+        for index, replica in enumerate(sessionmanager.replicas)
+    )
+    return (
+        render_metrics("db_pool", sessionmanager.pool_stats())
+        + replicas
+        + render_metrics("db_compiled_cache", compiled_cache_hit_rate())
+        + render_metrics("graphql_document_cache", document_cache.stats())
+        + render_metrics("graphql_statement_cache", statement_cache.stats())
+        + render_metrics("graphql_analytics_cache", analytics_cache.stats())
+        + render_metrics("graphql_persisted_queries", persisted_queries.stats())
+        + render_metrics("graphql_response_cache", getattr(response_cache.backend, "stats", dict)())
+        + render_metrics("graphql_subscribers", broker.stats())
+    )
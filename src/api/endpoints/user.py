@@ -1,24 +1,66 @@
 import logging
-from typing import List
+from itertools import chain
+from typing import List, Optional
 from fastapi import (
     APIRouter,
     Depends,
+    HTTPException,
+    Query,
 )
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import JSON, func, literal, literal_column
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import noload, joinedload
 from db import get_db_session
-from models import User
-from schemas import UserSchema
+from gql.queries import ModelMapper
+from models import User, Review
+from schemas import UserSchema, ReviewSchema
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Columns UserSchema reads from the users table; its reviews are aggregated separately.
+USER_LIST_COLUMNS = [getattr(User, name) for name in UserSchema.model_fields if name != "user_reviews"]
 
-@router.post("/users-list/", name="user:users-list",response_model=List[UserSchema])
+
+def user_reviews_json():
+    """
+    Aggregates the reviews of the outer user into a JSON array of ReviewSchema objects, so a page of
+    users and their reviews is one statement. Each user's reviews are read through ix_reviews_user_id.
+    """
+    review = func.json_build_object(*chain.from_iterable(
+        (literal(name), getattr(Review, name)) for name in ReviewSchema.model_fields
+    ))
+    return select(
+        func.coalesce(func.json_agg(review), literal_column("'[]'::json"), type_=JSON)
+    ).where(Review.user_id == User.id).scalar_subquery().label("user_reviews")
+
+
+@router.post("/users-list/", name="user:users-list", response_model=List[UserSchema])
 async def user(
+        is_active: Optional[bool] = None,
+        first_name: Optional[str] = None,
+        last_name: Optional[str] = None,
+        email: Optional[str] = None,
+        id_in: Optional[List[int]] = Query(None),
+        order_by: str = 'id',
+        skip: int = Query(0, ge=0, description="Number of records to skip"),
+        take: int = Query(50, ge=0, le=1000, description="Number of records to take"),
         db: AsyncSession = Depends(get_db_session),
 ):
-    q = await db.execute(select(User).options(noload(User.borrow_records_user),joinedload(User.user_reviews)).limit(50))
-    result = q.scalars().unique().all()
-    return result
+    """
+    Lists users with their reviews, filtered, ordered and paginated like the users query.
+
+    Only the columns of UserSchema are selected and rows are serialized with orjson as they come,
+    without building ORM objects or validating them through pydantic.
+    """
+    params = {key: value for key, value in {"is_active": is_active, "first_name": first_name,
+                                            "last_name": last_name, "email": email, "id_in": id_in}.items()
+              if value is not None}
+    try:
+        query = ModelMapper.list_query(select(*USER_LIST_COLUMNS, user_reviews_json()), 'USER_MAPPER', params,
+                                       order_by, skip, take)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    result = await db.execute(query)
+    return ORJSONResponse([row._asdict() for row in result])
@@ -0,0 +1,267 @@
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import httpx
+import orjson
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+parser = argparse.ArgumentParser(description='Benchmark representative GraphQL and REST operations in-process.')
+parser.add_argument('--seed_data', action='store_true', help='Reseed the database with fake_data.py --bulk first')  # --seed_data
+parser.add_argument('--users', type=int, help='Users to seed', default=1000)
+parser.add_argument('--books', type=int, help='Books to seed', default=1000)
+parser.add_argument('--borrow_records', type=int, help='Borrow records to seed', default=100000)
+parser.add_argument('--reviews', type=int, help='Reviews to seed', default=50000)
+parser.add_argument('--seed', type=int, help='Seed of the generated data', default=42)
+parser.add_argument('--requests', type=int, help='Measured requests per operation', default=200)
+parser.add_argument('--warmup', type=int, help='Unmeasured requests per operation', default=20)
+parser.add_argument('--concurrency', type=int, help='Requests in flight at a time', default=10)
+parser.add_argument('--operations', nargs='*', help='Only run these operations')
+parser.add_argument('--output', help='Write the results to this JSON file', default='benchmark_results.json')
+parser.add_argument('--baseline', help='Results of an earlier run to compare against')
+parser.add_argument('--max_regression', type=float, help='Allowed p95 slowdown against the baseline', default=0.25)
+parser.add_argument('--startup', action='store_true', help='Also measure the cold start of main.py --production')
+parser.add_argument('--startup_workers', type=int, help='Workers of the measured production server', default=1)
+parser.add_argument('--startup_runs', type=int, help='Cold starts to measure', default=5)
+
+#  python benchmark.py --seed_data --borrow_records 1000000 --output before.json
+#  python benchmark.py --baseline before.json --output after.json
+#  python benchmark.py --startup --startup_workers 4
+#  ANALYTICS_CACHE_SIZE=0 python benchmark.py --operations analytics_monthly  # uncached analytics SQL
+args = parser.parse_args()
+
+# Representative operations: (method, path, JSON body).
+OPERATIONS = {
+    "users_nested": ("POST", "/", {"query": """{
+        users(take: 50) {
+            id firstName lastName email
+            borrowRecordsUser { id dueDate returnDate book { id title author } }
+            userReviews { id rating book { id title } }
+        }
+    }"""}),
+    "books_aggregates": ("POST", "/", {"query": """{
+        books(take: 50) { id title author readersAvgRating averageBorrowedTime }
+    }"""}),
+    "borrows_records_page": ("POST", "/", {"query": """{
+        borrowsRecords(skip: 500, take: 50) { id borrowNote dueDate returnDate user { id email } book { id title } }
+    }"""}),
+    "borrows_records_connection": ("POST", "/", {"query": """{
+        borrowsRecordsConnection(first: 50) {
+            totalCount
+            pageInfo { hasNextPage endCursor }
+            edges { node { id dueDate user { id email } } }
+        }
+    }"""}),
+    "rest_users_list": ("POST", "/user/users-list/", None),
+    "analytics_monthly": ("POST", "/", {"query": """{
+        analytics(bucket: "month") {
+            overdueCount
+            topBorrowedBooks(take: 5) { period rank borrowCount book { id title } }
+            loanDurations(take: 10) { userId loans averageDays medianDays p90Days }
+            ratingHistogram { period rating count share }
+        }
+    }"""}),
+}
+
+# Options that only describe the data when this run seeded it.
+SEED_OPTIONS = ('users', 'books', 'borrow_records', 'reviews', 'seed')
+
+statement_count = 0
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    global statement_count
+    statement_count += 1
+
+
+def seed_database():
+    subprocess.run([
+        sys.executable, 'fake_data.py', '--bulk', '--clear', '--reset_indexes', '--seed', str(args.seed),
+        '--users', str(args.users), '--books', str(args.books),
+        '--borrow_records', str(args.borrow_records), '--reviews', str(args.reviews),
+    ], check=True)
+
+
+def percentile(latencies: list, percent: int) -> float:
+    return statistics.quantiles(latencies, n=100, method='inclusive')[percent - 1]
+
+
+async def run_operation(client: httpx.AsyncClient, name: str) -> dict:
+    """
+    Sends the warm-up and measured requests of one operation with the configured concurrency.
+
+    Returns:
+    - Throughput, latency percentiles in milliseconds and SQL statements per request.
+    """
+    global statement_count
+    method, path, body = OPERATIONS[name]
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def _request(measured: bool):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.request(method, path, json=body)
+            elapsed = time.perf_counter() - start
+        if response.status_code != 200 or (path == "/" and "errors" in response.json()):
+            raise Exception(f"{name} failed: {response.status_code} {response.text[:500]}")
+        if measured:
+            latencies.append(elapsed * 1000)
+
+    await asyncio.gather(*[_request(False) for _ in range(args.warmup)])
+    statement_count = 0
+    start = time.perf_counter()
+    await asyncio.gather(*[_request(True) for _ in range(args.requests)])
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": args.requests,
+        "throughput": args.requests / elapsed,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "sql_statements": statement_count / args.requests,
+    }
+
+
+async def run_benchmark() -> dict:
+    from main import app, lifespan
+
+    results = {}
+    async with lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            for name in args.operations or OPERATIONS:
+                results[name] = await run_operation(client, name)
+                print(f"{name:30} {results[name]['throughput']:8.1f} req/s  "
+                      f"p50 {results[name]['p50_ms']:7.1f}ms  p95 {results[name]['p95_ms']:7.1f}ms  "
+                      f"p99 {results[name]['p99_ms']:7.1f}ms  {results[name]['sql_statements']:.1f} statements")
+    return results
+
+
+def cold_start() -> tuple:
+    """
+    Starts `main.py --production` in a new process on a free port and waits for /healthz to report it ready.
+
+    Returns:
+    - Seconds from launching the process to the first served request, and milliseconds the first
+      GraphQL query took after that, with every cache still cold.
+    """
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    env = {**os.environ, "SERVER_HOST": "127.0.0.1", "SERVER_PORT": str(port),
+           "SESSION_SECRET_KEY": os.environ.get("SESSION_SECRET_KEY") or "benchmark"}
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, 'main.py', '--production', '--workers', str(args.startup_workers)],
+                               env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}") as client:
+            while True:
+                if process.poll() is not None:
+                    raise Exception(f"The server exited with status {process.returncode} during startup")
+                try:
+                    if client.get("/healthz").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.perf_counter() - start > 60:
+                    raise Exception("The server did not start within 60 seconds")
+                time.sleep(0.01)
+            first_request = time.perf_counter() - start
+
+            method, path, body = OPERATIONS["books_aggregates"]
+            query_start = time.perf_counter()
+            response = client.request(method, path, json=body)
+            first_query = time.perf_counter() - query_start
+            if response.status_code != 200 or "errors" in response.json():
+                raise Exception(f"First query failed: {response.status_code} {response.text[:500]}")
+    finally:
+        # SIGTERM, so every run also goes through the graceful shutdown.
+        process.terminate()
+        process.wait()
+    return first_request, first_query * 1000
+
+
+def run_startup_benchmark() -> dict:
+    """
+    Measures `--startup_runs` cold starts of the production server.
+
+    Returns:
+    - Median and worst seconds to the first served request, and the median first query latency in milliseconds.
+    """
+    runs = [cold_start() for _ in range(args.startup_runs)]
+    result = {
+        "workers": args.startup_workers,
+        "runs": args.startup_runs,
+        "first_request_s": statistics.median(first_request for first_request, _ in runs),
+        "first_request_max_s": max(first_request for first_request, _ in runs),
+        "first_query_ms": statistics.median(first_query for _, first_query in runs),
+    }
+    print(f"{'cold_start':30} first request {result['first_request_s']:.2f}s (max {result['first_request_max_s']:.2f}s)  "
+          f"first query {result['first_query_ms']:.1f}ms  {args.startup_workers} workers")
+    return result
+
+
+def find_regressions(results: dict, baseline: dict) -> list:
+    """
+    Lists the operations that got slower than the allowed p95 regression, or issue more SQL statements.
+    """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if result["p95_ms"] > previous["p95_ms"] * (1 + args.max_regression):
+            regressions.append(f"{name}: p95 {previous['p95_ms']:.1f}ms -> {result['p95_ms']:.1f}ms")
+        if result["sql_statements"] > previous["sql_statements"]:
+            regressions.append(
+                f"{name}: SQL statements {previous['sql_statements']:.1f} -> {result['sql_statements']:.1f}")
+    return regressions
+
+
+def find_startup_regressions(startup: dict, baseline: dict) -> list:
+    """
+    Reports a cold start that got slower than the allowed regression, when both runs measured one
+    with the same number of workers.
+    """
+    if not startup or not baseline or startup["workers"] != baseline["workers"]:
+        return []
+    if startup["first_request_s"] > baseline["first_request_s"] * (1 + args.max_regression):
+        return [f"cold_start: first request {baseline['first_request_s']:.2f}s -> {startup['first_request_s']:.2f}s"]
+    return []
+
+
+if __name__ == "__main__":
+    if args.seed_data:
+        seed_database()
+    results = asyncio.run(run_benchmark())
+    startup = run_startup_benchmark() if args.startup else None
+    with open(args.output, 'wb') as output:
+        output.write(orjson.dumps({
+            "timestamp": datetime.now().isoformat(),
+            "config": {key: value for key, value in vars(args).items()
+                       if key not in ('output', 'baseline') and (args.seed_data or key not in SEED_OPTIONS)},
+            "operations": results,
+            "startup": startup,
+        }, option=orjson.OPT_INDENT_2))
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'rb') as baseline_file:
+            baseline = orjson.loads(baseline_file.read())
+        regressions = (find_regressions(results, baseline["operations"])
+                       + find_startup_regressions(startup, baseline.get("startup")))
+        if regressions:
+            print("Regressions against the baseline:")
+            for regression in regressions:
+                print(f"- {regression}")
+            sys.exit(1)
+        print("No regressions against the baseline.")
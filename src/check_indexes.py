@@ -0,0 +1,131 @@
+import argparse
+import sys
+from datetime import date, datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.future import select
+
+from config import settings
+from gql.analytics import AnalyticsWindow, rating_histogram_query, top_borrowed_books_query, overdue_loans_query
+from gql.pagination import encode_cursor
+from gql.queries import ModelMapper
+from models import Book, BorrowRecord, Review, User, apply_book_search
+
+parser = argparse.ArgumentParser(description='Check that the query shapes of the API are served by their indexes.')
+
+#  python check_indexes.py
+args = parser.parse_args()
+
+engine = create_engine(settings.get_sync_connection_url())
+
+# Query shapes issued by gql/queries.py and gql/loaders.py, with the index each one should use.
+QUERY_SHAPES = {
+    "borrowsRecords(bookIdIn:) newest first": (
+        select(BorrowRecord).filter(*ModelMapper.get_filter_exp({"book_id_in": [1, 2, 3]}, 'BORROW_MAPPER'))
+        .order_by(ModelMapper.ordering('-created_at', BorrowRecord)).limit(50),
+        'ix_borrow_records_book_id_created_at',
+    ),
+    "borrowsRecordsConnection page after a cursor": (
+        ModelMapper.apply_keyset_pagination(
+            select(BorrowRecord), BorrowRecord, 'created_at', 50, encode_cursor(datetime(2024, 1, 1), 1000)),
+        'ix_borrow_records_created_at_id',
+    ),
+    "borrowsRecords newest first in the hot partitions": (
+        select(BorrowRecord).filter(*ModelMapper.get_filter_exp(ModelMapper.hot_borrow_records({}), 'BORROW_MAPPER'))
+        .order_by(ModelMapper.ordering('-created_at', BorrowRecord)).limit(50),
+        'ix_borrow_records_created_at_id',
+    ),
+    "borrow records by user loader": (
+        select(BorrowRecord).filter(BorrowRecord.user_id.in_([1, 2, 3])),
+        'ix_borrow_records_user_id',
+    ),
+    "reviews by user loader": (
+        select(Review).filter(Review.user_id.in_([1, 2, 3])),
+        'ix_reviews_user_id',
+    ),
+    "reviews of a book": (
+        select(Review).filter(Review.book_id == 1),
+        'ix_reviews_book_id',
+    ),
+    "open loans by due date": (
+        select(BorrowRecord).filter(BorrowRecord.return_date.is_(None)).order_by(BorrowRecord.due_date).limit(50),
+        'ix_borrow_records_open_loans',
+    ),
+    "users(where: {lastNamePrefix:})": (
+        select(User).filter(*ModelMapper.get_filter_exp({"where": {"last_name_prefix": "Sm"}}, 'USER_MAPPER')).limit(50),
+        'ix_users_last_name_pattern',
+    ),
+    "books(where: {datePublishedGt:})": (
+        select(Book).filter(*ModelMapper.get_filter_exp({"where": {"date_published_gt": date(2015, 1, 1)}}, 'BOOK_MAPPER')),
+        'ix_books_date_published',
+    ),
+    "borrowsRecords(where: {dueDateBetween:})": (
+        select(BorrowRecord).filter(*ModelMapper.get_filter_exp(
+            {"where": {"due_date_between": [date(2024, 1, 1), date(2024, 1, 7)]}}, 'BORROW_MAPPER')),
+        'ix_borrow_records_due_date',
+    ),
+    "analytics topBorrowedBooks of a month": (
+        top_borrowed_books_query(AnalyticsWindow('month', datetime(2024, 1, 1), datetime(2024, 2, 1)), 10),
+        'ix_borrow_records_created_at_id',
+    ),
+    "analytics ratingHistogram of a month": (
+        rating_histogram_query(AnalyticsWindow('month', datetime(2024, 1, 1), datetime(2024, 2, 1))),
+        'ix_reviews_created_at',
+    ),
+    "analytics overdueLoans": (
+        overdue_loans_query(50),
+        'ix_borrow_records_open_loans',
+    ),
+    "searchBooks full-text match": (
+        apply_book_search(select(Book.id), 'harry potter', 'postgresql').limit(20),
+        'ix_books_search_vector',
+    ),
+    "searchBooks misspelled title": (
+        apply_book_search(select(Book.id), 'hary poter', 'postgresql').limit(20),
+        'ix_books_title_trgm',
+    ),
+}
+
+
+def used_indexes(plan: dict) -> set:
+    """
+    Collects the names of all indexes referenced anywhere in an EXPLAIN (FORMAT JSON) plan node.
+    """
+    indexes = {plan["Index Name"]} if "Index Name" in plan else set()
+    for child in plan.get("Plans", []):
+        indexes |= used_indexes(child)
+    return indexes
+
+
+def parent_indexes(connection) -> dict:
+    """
+    Maps the indexes of partitions, e.g. of borrow_records, to the index of the partitioned table they belong to.
+    """
+    return dict(connection.exec_driver_sql(
+        "SELECT child.relname, parent.relname FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent WHERE child.relkind = 'i'"
+    ).all())
+
+
+def explain(connection, statement, parents: dict) -> set:
+    # The statement is sent without parameters, so '%' in operators like '<%' must not be escaped.
+    compiled = statement.compile(dialect=postgresql.psycopg.dialect(paramstyle='named'),
+                                 compile_kwargs={"literal_binds": True})
+    result = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}")
+    return {parents.get(index, index) for index in used_indexes(result.scalar()[0]["Plan"])}
+
+
+if __name__ == "__main__":
+    failures = 0
+    with engine.connect() as connection:
+        # Small development tables are cheaper to scan sequentially, so only ask whether an index can serve the shape.
+        connection.exec_driver_sql("SET enable_seqscan = off")
+        parents = parent_indexes(connection)
+        for name, (statement, expected_index) in QUERY_SHAPES.items():
+            indexes = explain(connection, statement, parents)
+            ok = expected_index in indexes
+            failures += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {name}: expected {expected_index}, plan uses {sorted(indexes) or 'no index'}")
+    sys.exit(1 if failures else 0)
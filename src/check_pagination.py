@@ -0,0 +1,84 @@
+import argparse
+import random
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert, select
+
+from gql.filters import FILTER_COLUMNS
+from gql.pagination import encode_cursor
+from gql.queries import ModelMapper
+from models import BorrowRecord
+
+parser = argparse.ArgumentParser(description='Check that keyset pagination returns every borrow record exactly once for every order.')
+parser.add_argument('--rows', type=int, help='Borrow records to page through', default=60)
+parser.add_argument('--first', type=int, help='Page size', default=7)
+parser.add_argument('--seed', type=int, help='Seed of the generated rows', default=1)
+
+#  python check_pagination.py --rows 60 --first 7
+args = parser.parse_args()
+
+
+def seed_rows(connection, count: int, rng: random.Random):
+    """
+    Inserts borrow records where about half of the nullable columns are null and values repeat,
+    so pages end on nulls and on ties as well as on distinct values.
+    """
+    rows = []
+    for row_id in range(1, count + 1):
+        created_at = datetime(2024, 1, 1) + timedelta(days=rng.randrange(30))
+        rows.append({
+            "id": row_id,
+            "user_id": rng.randrange(1, 5),
+            "book_id": rng.randrange(1, 5),
+            "created_at": created_at,
+            "due_date": created_at.date() + timedelta(days=14) if rng.random() < 0.8 else None,
+            "return_date": created_at.date() + timedelta(days=rng.randrange(5)) if rng.random() < 0.5 else None,
+        })
+    connection.execute(insert(BorrowRecord.__table__), rows)
+
+
+def page_through(connection, order: str, first: int) -> list:
+    """
+    Follows the end cursors of an order from the first page to the last.
+
+    Returns:
+    - The ids in the order they were returned.
+    """
+    column_name = order.lstrip('-')
+    ids, after = [], None
+    while True:
+        rows = connection.execute(ModelMapper.apply_keyset_pagination(
+            select(BorrowRecord.id, getattr(BorrowRecord, column_name)), BorrowRecord, order, first, after)).all()
+        ids.extend(row.id for row in rows[:first])
+        if len(rows) <= first:
+            return ids
+        last = rows[first - 1]
+        after = encode_cursor(getattr(last, column_name), last.id)
+
+
+def expected_ids(rows: list, order: str) -> list:
+    # Nulls sort after every value, in both directions of the column.
+    column_name, descending = order.lstrip('-'), order.startswith('-')
+    values = [row for row in rows if getattr(row, column_name) is not None]
+    nulls = [row for row in rows if getattr(row, column_name) is None]
+    values.sort(key=lambda row: (getattr(row, column_name), row.id), reverse=descending)
+    nulls.sort(key=lambda row: row.id, reverse=descending)
+    return [row.id for row in (nulls + values if descending else values + nulls)]
+
+
+if __name__ == "__main__":
+    engine = create_engine("sqlite://")
+    with engine.begin() as connection:
+        BorrowRecord.__table__.create(connection)
+        seed_rows(connection, args.rows, random.Random(args.seed))
+        rows = connection.execute(select(BorrowRecord.__table__)).all()
+
+        failed = False
+        for column_name in FILTER_COLUMNS[BorrowRecord]:
+            for order in (column_name, f"-{column_name}"):
+                ids = page_through(connection, order, args.first)
+                ok = ids == expected_ids(rows, order)
+                failed = failed or not ok
+                print(f"{'ok  ' if ok else 'FAIL'} {order:14} {len(ids)} of {len(rows)} rows")
+    sys.exit(1 if failed else 0)
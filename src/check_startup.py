@@ -0,0 +1,61 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+
+parser = argparse.ArgumentParser(description='Check that importing and warming up the app stays within a cold start budget.')
+parser.add_argument('--budget_ms', type=float, help='Allowed milliseconds for importing main and warming it up', default=1500)
+parser.add_argument('--runs', type=int, help='Imports to measure, the fastest one is checked', default=3)
+parser.add_argument('--top', type=int, help='Number of slowest top-level packages to list', default=10)
+
+#  python check_startup.py --budget_ms 1500
+args = parser.parse_args()
+
+# Imports the app in a fresh interpreter and warms it up like the server does before serving.
+STARTUP_SCRIPT = """
+import time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+main.warm_up()
+print(f"{(imported - start) * 1000} {(time.perf_counter() - imported) * 1000}")
+"""
+
+
+def measure() -> tuple:
+    """
+    Runs the startup script under `python -X importtime`.
+
+    Returns:
+    - Milliseconds spent importing main and warming it up, and the self import time of every module in microseconds.
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT],
+                            capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    import_ms, warm_up_ms = (float(value) for value in result.stdout.split()[-2:])
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(self_us)
+    return import_ms, warm_up_ms, modules
+
+
+if __name__ == "__main__":
+    runs = [measure() for _ in range(args.runs)]
+    import_ms, warm_up_ms, modules = min(runs, key=lambda run: run[0] + run[1])
+
+    packages = Counter()
+    for name, self_us in modules.items():
+        packages[name.split('.')[0]] += self_us
+    print("Slowest packages to import:")
+    for package, self_us in packages.most_common(args.top):
+        print(f"  {package:30} {self_us / 1000:8.1f}ms")
+
+    total = import_ms + warm_up_ms
+    ok = total <= args.budget_ms
+    print(f"{'ok  ' if ok else 'FAIL'} import {import_ms:.0f}ms + warm up {warm_up_ms:.0f}ms = {total:.0f}ms "
+          f"(budget {args.budget_ms:.0f}ms)")
+    sys.exit(0 if ok else 1)
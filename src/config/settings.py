@@ -1,16 +1,11 @@
-import sys
 from pathlib import Path
-
-BASE_DIR = Path(__file__).resolve().parents[0]
-
-sys.path.append(str(BASE_DIR))
-
 from typing import Any, Dict, Optional
 from pydantic_settings import BaseSettings
 from pydantic import PostgresDsn, field_validator
-from pathlib import Path
 from dotenv import load_dotenv
 
+BASE_DIR = Path(__file__).resolve().parents[0]
+
 env_path = Path(f"{BASE_DIR}/.env")
 load_dotenv(dotenv_path=env_path)
 
@@ -25,13 +20,111 @@ class Settings(BaseSettings):
     BACKEND_CORS_ORIGINS: bool = True
     ADD_MUTATION: int = 0
     SERVER_PORT: int = 8000
-    RELOAD: bool = True
+    RELOAD: bool = False
+
+    # `python main.py --production` serves with WEB_CONCURRENCY preforked workers (0 sizes it to the
+    # available cores). Workers get GRACEFUL_SHUTDOWN_TIMEOUT seconds to finish their requests on SIGTERM.
+    SERVER_HOST: str = "0.0.0.0"
+    WEB_CONCURRENCY: int = 0
+    GRACEFUL_SHUTDOWN_TIMEOUT: int = 30
+
+    # Signs the session cookie. Required in production, where every worker and host must share it.
+    SESSION_SECRET_KEY: Optional[str] = None
+
+    # Connection pool tuning. DB_NULL_POOL opens a fresh connection per checkout,
+    # which is what pgbouncer in transaction mode expects.
+    DB_NULL_POOL: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_WARMUP: int = 0
+
+    # Statement caches. DB_COMPILED_CACHE_SIZE is SQLAlchemy's per-engine cache of compiled SQL,
+    # DB_PREPARED_STATEMENT_CACHE_SIZE the asyncpg prepared statements kept per pooled connection
+    # (they go with the connection, so DB_NULL_POOL gets no reuse across requests), and
+    # STATEMENT_CACHE_SIZE the statements of the list fields, built once per query shape.
+    DB_COMPILED_CACHE_SIZE: int = 1000
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 256
+    STATEMENT_CACHE_SIZE: int = 500
+
+    # Comma separated async URLs of read replicas. Query operations are spread over them with
+    # DB_REPLICA_ROUTING ("round_robin" or "least_busy"); mutations always use the primary.
+    # Replicas more than DB_REPLICA_MAX_LAG seconds behind are left out until they catch up.
+    # DB_READ_YOUR_WRITES_SECONDS pins a client to the primary for that long after a mutation.
+    DB_REPLICA_URLS: str = ""
+    DB_REPLICA_ROUTING: str = "round_robin"
+    DB_REPLICA_MAX_LAG: float = 10.0
+    DB_REPLICA_HEALTH_INTERVAL: float = 5.0
+    DB_READ_YOUR_WRITES_SECONDS: float = 0
+
+    # GraphQL document caching and automatic persisted queries.
+    DOCUMENT_CACHE_SIZE: int = 1000
+    APQ_CACHE_SIZE: int = 1000
+    APQ_GET_MAX_AGE: int = 0
+
+    # borrow_records is partitioned by month. borrowsRecords and borrowsRecordsConnection only read the
+    # last BORROW_RECORDS_HOT_MONTHS months (0 reads everything) unless asked for archived loans;
+    # partition_borrow_records.py keeps BORROW_RECORDS_PARTITIONS_AHEAD months of partitions ready.
+    BORROW_RECORDS_HOT_MONTHS: int = 12
+    BORROW_RECORDS_PARTITIONS_AHEAD: int = 3
+
+    # analytics reports. Windows span ANALYTICS_DEFAULT_BUCKETS buckets unless given, and at most
+    # ANALYTICS_MAX_BUCKETS. Reports of windows that have ended are cached for ANALYTICS_CLOSED_CACHE_TTL
+    # seconds, all others for ANALYTICS_CACHE_TTL.
+    ANALYTICS_DEFAULT_BUCKETS: int = 12
+    ANALYTICS_MAX_BUCKETS: int = 366
+    ANALYTICS_CACHE_SIZE: int = 1000
+    ANALYTICS_CACHE_TTL: int = 60
+    ANALYTICS_CLOSED_CACHE_TTL: int = 3600
+
+    # Most items a single bulk mutation (addBooks, createBorrowRecords, returnBooks) accepts.
+    BULK_MUTATION_MAX_ITEMS: int = 10000
+
+    # Pub/sub backend of the GraphQL subscriptions: "memory" (single process), "postgres"
+    # (LISTEN/NOTIFY, shared by all workers), "module:Class", or "auto", which is "postgres" when
+    # served by more than one worker and "memory" otherwise. The LISTEN connection is checked every
+    # PUBSUB_LISTEN_CHECK_INTERVAL seconds and reopened when lost. Slow subscribers keep at most
+    # SUBSCRIPTION_QUEUE_SIZE pending events.
+    PUBSUB_BACKEND: str = "auto"
+    PUBSUB_LISTEN_CHECK_INTERVAL: float = 10.0
+    SUBSCRIPTION_QUEUE_SIZE: int = 100
+
+    # Rows fetched per round trip by the server-side cursors of the /export/ routes.
+    EXPORT_CHUNK_SIZE: int = 1000
+
+    # Opt-in result cache for read-only queries. RESPONSE_CACHE_BACKEND is "memory" (single process),
+    # "postgres" (tag versions shared by all workers and hosts), "module:Class", or "auto", which is
+    # "postgres" when served by more than one worker and "memory" otherwise.
+    RESPONSE_CACHE_ENABLED: bool = False
+    RESPONSE_CACHE_TTL: int = 60
+    RESPONSE_CACHE_SIZE: int = 1000
+    RESPONSE_CACHE_BACKEND: str = "auto"
+
+    # Operations deeper or costlier than this are rejected before they run.
+    GRAPHQL_MAX_DEPTH: int = 10
+    GRAPHQL_MAX_COST: int = 10000
+    GRAPHQL_DEFAULT_LIST_SIZE: int = 10
+
+    # Transaction options for the session shared by the resolvers of a query operation,
+    # e.g. "REPEATABLE READ" for one consistent snapshot across all root fields.
+    GRAPHQL_QUERY_ISOLATION_LEVEL: Optional[str] = None
+    GRAPHQL_QUERY_READ_ONLY: bool = False
+
+    # Lets clients request resolver and SQL timings with the X-Debug-Tracing header.
+    # Statements repeated more than TRACING_N_PLUS_ONE_THRESHOLD times in one request are reported as N+1.
+    TRACING_ENABLED: bool = False
+    TRACING_N_PLUS_ONE_THRESHOLD: int = 5
 
     SQLALCHEMY_ASYNC_DATABASE_URI: Optional[PostgresDsn] = None
 
     def get_async_connection_url(self):
         return f"{self.POSTGRES_SCHEME}://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
 
+    def get_replica_urls(self):
+        return [url.strip() for url in self.DB_REPLICA_URLS.split(",") if url.strip()]
+
     def get_sync_connection_url(self):
         return f"postgresql+psycopg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
 
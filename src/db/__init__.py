@@ -1 +1 @@
-from .session import sessionmanager, get_db_session
+from .session import sessionmanager, get_db_session, RequestSession, compiled_cache_hit_rate
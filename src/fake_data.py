@@ -1,6 +1,10 @@
 import argparse
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
 from faker import Faker
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, func, insert, select, text
 from sqlalchemy.ext.declarative import declarative_base, declared_attr
 from sqlalchemy.orm import sessionmaker, relationship
 
@@ -8,6 +12,7 @@ from sqlalchemy.orm import sessionmaker, relationship
 from config import settings
 from models import User, Book, BorrowRecord
 from models.book import Review
+from models.stats import refresh_book_stats_statement
 
 Base = declarative_base()
 fake = Faker()
@@ -20,8 +25,14 @@ parser.add_argument('--borrow_records', type=int, help='Number of borrow records
 parser.add_argument('--reviews', type=int, help='Number of reviews to generate', default=100)  # --reviews 1000
 parser.add_argument('--clear', action='store_true', help='Clear tables before generating new data')  # --clear
 parser.add_argument('--reset_indexes', action='store_true', help='Reset PostgreSQL sequence indexes')  # --reset_indexes
+parser.add_argument('--bulk', action='store_true', help='Generate and load rows in chunks instead of ORM objects')  # --bulk
+parser.add_argument('--seed', type=int, help='Seed for reproducible bulk data', default=None)  # --seed 42
+parser.add_argument('--chunk_size', type=int, help='Rows generated and loaded at a time in bulk mode', default=10000)
+parser.add_argument('--workers', type=int, help='Processes generating and loading chunks in bulk mode', default=1)
+parser.add_argument('--loader', choices=['copy', 'insert'], help='COPY or batched INSERTs in bulk mode', default='copy')
 
 #  python fake_data.py --users 1000 --books 5000 --borrow_records 1500 --reviews 5500 --clear --reset_indexes
+#  python fake_data.py --users 100000 --books 50000 --borrow_records 10000000 --reviews 2000000 --bulk --workers 8 --seed 42
 args = parser.parse_args()
 
 # Database setup
@@ -103,6 +114,160 @@ class GenerateFakeData:
         print("PostgreSQL sequence indexes reset.")
 
 
+# Distinct notes and comments generated per chunk in bulk mode.
+BULK_TEXT_POOL_SIZE = 200
+
+# Days back from the seeding run over which the created_at of bulk borrow records and reviews is spread.
+BULK_HISTORY_DAYS = 365
+
+
+def bulk_users(faker, first_row, count, user_ids, book_ids, created_at):
+    for row in range(first_row, first_row + count):
+        local, domain = faker.ascii_free_email().split('@')
+        yield (
+            f"{local}.{row}@{domain}",  # The row number keeps emails unique across chunks and workers.
+            faker.password(length=12),
+            faker.first_name(),
+            faker.last_name(),
+            faker.date_of_birth(tzinfo=None, minimum_age=18, maximum_age=90),
+            faker.boolean(),
+            created_at,
+            False,
+        )
+
+
+def bulk_books(faker, first_row, count, user_ids, book_ids, created_at):
+    for row in range(first_row, first_row + count):
+        yield (
+            faker.sentence(nb_words=5),
+            faker.name(),
+            f"{faker.lexify(text='???')}-{row:08d}",
+            faker.date_between(start_date='-30y', end_date='today'),
+            str(faker.random_int(min=100, max=1000)),
+            faker.company(),
+            created_at,
+            False,
+        )
+
+
+def bulk_borrow_records(faker, first_row, count, user_ids, book_ids, created_at):
+    # Faker's text and date providers are far slower than loading a row, so notes are drawn from
+    # a per-chunk pool and dates are computed from plain random offsets.
+    rng, today = faker.random, date.today()
+    notes = [faker.text(max_nb_chars=200) for _ in range(min(count, BULK_TEXT_POOL_SIZE))]
+    for _ in range(count):
+        # Loans are spread over the history, so analytics and partitions see more than a single day.
+        loaned_at = created_at - timedelta(days=rng.randrange(BULK_HISTORY_DAYS), seconds=rng.randrange(86400))
+        yield (
+            rng.choice(user_ids),
+            rng.choice(book_ids),
+            rng.choice(notes),
+            loaned_at.date() + timedelta(days=rng.randint(1, 30)),
+            min(loaned_at.date() + timedelta(days=rng.randint(0, 30)), today) if rng.random() < 0.25 else None,
+            loaned_at,
+            False,
+        )
+
+
+def bulk_reviews(faker, first_row, count, user_ids, book_ids, created_at):
+    rng = faker.random
+    comments = [faker.text(max_nb_chars=500) for _ in range(min(count, BULK_TEXT_POOL_SIZE))]
+    for _ in range(count):
+        yield (
+            rng.choice(user_ids),
+            rng.choice(book_ids),
+            rng.randint(1, 10),
+            rng.choice(comments),
+            created_at - timedelta(days=rng.randrange(BULK_HISTORY_DAYS), seconds=rng.randrange(86400)),
+            False,
+        )
+
+
+# Table, loaded columns and row generator of every bulk seeded model.
+BULK_TABLES = {
+    'users': (User.__table__, ('email', 'password', 'first_name', 'last_name', 'birth_date', 'is_active',
+                               'created_at', 'is_archive'), bulk_users),
+    'books': (Book.__table__, ('title', 'author', 'serial_number', 'date_published', 'pages', 'publisher',
+                               'created_at', 'is_archive'), bulk_books),
+    'borrow_records': (BorrowRecord.__table__, ('user_id', 'book_id', 'borrow_note', 'due_date', 'return_date',
+                                                'created_at', 'is_archive'), bulk_borrow_records),
+    'reviews': (Review.__table__, ('user_id', 'book_id', 'rating', 'comment', 'created_at', 'is_archive'), bulk_reviews),
+}
+
+# Foreign key candidates of the current bulk run, set in every worker by init_bulk_worker.
+bulk_ids = {'users': [], 'books': []}
+
+
+def init_bulk_worker(user_ids, book_ids):
+    # Connections inherited from the parent process must not be reused after the fork.
+    engine.dispose(close=False)
+    bulk_ids['users'], bulk_ids['books'] = user_ids, book_ids
+
+
+def load_bulk_chunk(table_name, chunk, first_row, count, seed, loader, created_at):
+    """
+    Generates and loads one chunk of rows. Every chunk seeds its own Faker from the run seed, the table
+    and the chunk number, so the rows are the same for a given seed whatever the number of workers
+    (with several workers, chunks may be loaded, and get their ids, in a different order).
+    """
+    table, columns, generate = BULK_TABLES[table_name]
+    faker = Faker()
+    faker.seed_instance(f"{seed}-{table_name}-{chunk}")
+    rows = generate(faker, first_row, count, bulk_ids['users'], bulk_ids['books'], created_at)
+    with engine.begin() as connection:
+        if loader == 'copy':
+            with connection.connection.driver_connection.cursor() as cursor:
+                with cursor.copy(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN") as copy:
+                    for row in rows:
+                        copy.write_row(row)
+        else:
+            connection.execute(insert(table), [dict(zip(columns, row)) for row in rows])
+    return count
+
+
+class BulkFakeData:
+    """
+    Seeds large volumes by generating rows in chunks, optionally across a process pool, and loading them
+    with COPY or batched INSERTs. Only the ids of users and books are ever read back.
+    """
+
+    def __init__(self, seed=None, chunk_size=10000, workers=1, loader='copy'):
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.loader = loader
+        self.created_at = datetime.now()
+        print(f"Bulk seed: {self.seed}")
+
+    def create(self, table_name, n):
+        with engine.connect() as connection:
+            user_ids = connection.scalars(select(User.id).order_by(User.id)).all()
+            book_ids = connection.scalars(select(Book.id).order_by(Book.id)).all()
+            first_row = connection.scalar(select(func.coalesce(func.max(BULK_TABLES[table_name][0].c.id), 0))) + 1
+        if table_name in ('borrow_records', 'reviews') and not (user_ids and book_ids):
+            print(f"Skipping {table_name}: there are no users or books to reference.")
+            return
+
+        chunks = [(table_name, chunk, first_row + start, min(self.chunk_size, n - start), self.seed, self.loader,
+                   self.created_at) for chunk, start in enumerate(range(0, n, self.chunk_size))]
+        start_time = time.perf_counter()
+        if self.workers > 1:
+            with ProcessPoolExecutor(self.workers, initializer=init_bulk_worker,
+                                     initargs=(user_ids, book_ids)) as pool:
+                loaded = sum(pool.map(load_bulk_chunk, *zip(*chunks)))
+        else:
+            bulk_ids['users'], bulk_ids['books'] = user_ids, book_ids
+            loaded = sum(load_bulk_chunk(*chunk) for chunk in chunks)
+        elapsed = time.perf_counter() - start_time
+        print(f"Inserted {loaded} {table_name} in {elapsed:.1f}s ({loaded / elapsed:,.0f} rows/sec).")
+
+    def refresh_book_stats(self):
+        # Bulk loads bypass the ORM events that keep book_stats up to date.
+        with engine.begin() as connection:
+            connection.execute(refresh_book_stats_statement())
+        print("Book stats refreshed.")
+
+
 if __name__ == "__main__":
     Base.metadata.create_all(engine)  # Ensure all tables are created
     faker_instance = GenerateFakeData()
@@ -110,11 +275,18 @@ if __name__ == "__main__":
         faker_instance.clear_tables()
         if args.reset_indexes:  # Reset Index Sequences
             faker_instance.reset_postgres_indexes()
-    if args.users:
-        faker_instance.create_fake_users(args.users)
-    if args.books:
-        faker_instance.create_fake_books(args.books)
-    if args.borrow_records and args.users and args.books:
-        faker_instance.create_fake_borrow_records(args.borrow_records)
-    if args.reviews and args.users and args.books:
-        faker_instance.create_fake_reviews(args.reviews)
+    if args.bulk:
+        bulk = BulkFakeData(seed=args.seed, chunk_size=args.chunk_size, workers=args.workers, loader=args.loader)
+        for table_name in BULK_TABLES:
+            if getattr(args, table_name):
+                bulk.create(table_name, getattr(args, table_name))
+        bulk.refresh_book_stats()
+    else:
+        if args.users:
+            faker_instance.create_fake_users(args.users)
+        if args.books:
+            faker_instance.create_fake_books(args.books)
+        if args.borrow_records and args.users and args.books:
+            faker_instance.create_fake_borrow_records(args.borrow_records)
+        if args.reviews and args.users and args.books:
+            faker_instance.create_fake_reviews(args.reviews)
@@ -2,5 +2,8 @@ from graphene import Schema
 
 from .queries import Query
 from .mutate import MUTATE
+from .subscriptions import Subscription
+from .context import get_context
+from .app import LibraryGraphQLApp
 
-gql_schema = Schema(query=Query,**MUTATE)
+gql_schema = Schema(query=Query, subscription=Subscription, **MUTATE)
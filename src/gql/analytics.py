@@ -0,0 +1,244 @@
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Optional
+
+from graphene import Argument, Int, List, ObjectType
+from sqlalchemy import Date, Float, cast, desc, func, literal_column, select
+
+from config import settings
+from gql.cache import analytics_cache
+from gql.types import TopBookObject, LoanDurationObject, OverdueLoanObject, RatingBucketObject
+from models import BorrowRecord, Review
+
+# Periods the reports can be bucketed by, as understood by Postgres' date_trunc.
+BUCKETS = ("day", "week", "month", "year")
+
+
+def bucket_start(moment: datetime, bucket: str) -> datetime:
+    """
+    Returns the start of the bucket `moment` falls in, the same as date_trunc(bucket, moment).
+    """
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    if bucket == "year":
+        return day.replace(month=1, day=1)
+    return day
+
+
+def naive_local(moment: datetime) -> datetime:
+    """
+    Converts a timezone aware datetime to the naive local time the timestamp columns are stored in
+    (they default to datetime.now()), and returns naive ones unchanged.
+    """
+    if moment.tzinfo is None:
+        return moment
+    return moment.astimezone().replace(tzinfo=None)
+
+
+def shift_bucket(start: datetime, bucket: str, count: int) -> datetime:
+    """
+    Moves the start of a bucket `count` buckets forward, or backward when negative.
+    """
+    if bucket == "week":
+        return start + timedelta(weeks=count)
+    if bucket == "month":
+        months = start.year * 12 + start.month - 1 + count
+        return start.replace(year=months // 12, month=months % 12 + 1)
+    if bucket == "year":
+        return start.replace(year=start.year + count)
+    return start + timedelta(days=count)
+
+
+class AnalyticsWindow:
+    """
+    The period an analytics query reports on, widened to whole buckets so that equal windows share
+    cached results.
+
+    Parameters:
+    - bucket: One of BUCKETS.
+    - since: Optional; start of the period, defaults to ANALYTICS_DEFAULT_BUCKETS buckets before `until`.
+    - until: Optional; end of the period, defaults to now.
+
+    Timezone aware `since` and `until` are converted to naive local time, like the stored timestamps.
+    """
+
+    def __init__(self, bucket: str, since: Optional[datetime] = None, until: Optional[datetime] = None):
+        if bucket not in BUCKETS:
+            raise ValueError(f"Unknown bucket '{bucket}', expected one of {', '.join(BUCKETS)}")
+        until = naive_local(until) if until else datetime.now()
+        since = naive_local(since) if since else None
+        self.bucket = bucket
+        self.until = bucket_start(until, bucket)
+        if self.until != until:
+            self.until = shift_bucket(self.until, bucket, 1)
+        self.since = bucket_start(since, bucket) if since else shift_bucket(
+            self.until, bucket, -settings.ANALYTICS_DEFAULT_BUCKETS)
+        if self.since >= self.until:
+            raise ValueError("'since' must be before 'until'")
+        if shift_bucket(self.since, bucket, settings.ANALYTICS_MAX_BUCKETS) < self.until:
+            raise ValueError(f"A report spans at most {settings.ANALYTICS_MAX_BUCKETS} buckets")
+
+    @property
+    def closed(self) -> bool:
+        """
+        Whether the window ended before the current bucket, after which rows stamped with a time in it no longer change.
+        """
+        return self.until <= bucket_start(datetime.now(), self.bucket)
+
+    def key(self) -> tuple:
+        return self.bucket, self.since, self.until
+
+
+def _period(column, bucket: str):
+    # Inlined rather than bound, so Postgres sees the same expression in SELECT, GROUP BY and the window.
+    return func.date_trunc(literal_column(f"'{bucket}'"), column)
+
+
+def top_borrowed_books_query(window: AnalyticsWindow, take: int):
+    """
+    Builds the select of the `take` most borrowed books of every bucket of the window. Loans are counted
+    per bucket and book and ranked within their bucket in a single pass over the window's borrow records.
+    """
+    period = _period(BorrowRecord.created_at, window.bucket)
+    borrow_count = func.count()
+    ranked = select(
+        period.label("period"),
+        BorrowRecord.book_id,
+        borrow_count.label("borrow_count"),
+        func.rank().over(partition_by=period, order_by=borrow_count.desc()).label("rank"),
+    ).filter(
+        BorrowRecord.created_at >= window.since, BorrowRecord.created_at < window.until,
+    ).group_by(period, BorrowRecord.book_id).subquery()
+    return select(ranked).filter(ranked.c.rank <= take).order_by(ranked.c.period, ranked.c.rank, ranked.c.book_id)
+
+
+def loan_durations_query(window: AnalyticsWindow, take: int):
+    """
+    Builds the select of the average, median and 90th percentile number of days the returned loans of
+    each user lasted, for loans made in the window, longest average first.
+    """
+    days = BorrowRecord.return_date - cast(BorrowRecord.created_at, Date)
+    average_days = func.avg(days)
+    return select(
+        BorrowRecord.user_id,
+        func.count().label("loans"),
+        cast(average_days, Float).label("average_days"),
+        func.percentile_cont(0.5).within_group(days).label("median_days"),
+        func.percentile_cont(0.9).within_group(days).label("p90_days"),
+    ).filter(
+        BorrowRecord.return_date.isnot(None),
+        BorrowRecord.created_at >= window.since, BorrowRecord.created_at < window.until,
+    ).group_by(BorrowRecord.user_id).order_by(desc(average_days), BorrowRecord.user_id).limit(take)
+
+
+def overdue_loans_query(take: int):
+    """
+    Builds the select of the loans furthest past their due date that have not been returned,
+    served by the ix_borrow_records_open_loans partial index.
+    """
+    return select(
+        BorrowRecord.id,
+        BorrowRecord.due_date,
+        (func.current_date() - BorrowRecord.due_date).label("days_overdue"),
+        BorrowRecord.user_id,
+        BorrowRecord.book_id,
+    ).filter(
+        BorrowRecord.return_date.is_(None), BorrowRecord.due_date < func.current_date(),
+    ).order_by(BorrowRecord.due_date, BorrowRecord.id).limit(take)
+
+
+def overdue_count_query():
+    """
+    Builds the count of the loans past their due date that have not been returned.
+    """
+    return select(func.count()).select_from(BorrowRecord).filter(
+        BorrowRecord.return_date.is_(None), BorrowRecord.due_date < func.current_date())
+
+
+def rating_histogram_query(window: AnalyticsWindow, book_id: Optional[int] = None):
+    """
+    Builds the select of the number of reviews per rating in every bucket of the window, with each
+    rating's share of its bucket computed by a window over the grouped counts.
+    """
+    period = _period(Review.created_at, window.bucket)
+    count = func.count()
+    statement = select(
+        period.label("period"),
+        Review.rating,
+        count.label("count"),
+        (cast(count, Float) / cast(func.sum(count).over(partition_by=period), Float)).label("share"),
+    ).filter(Review.created_at >= window.since, Review.created_at < window.until)
+    if book_id is not None:
+        statement = statement.filter(Review.book_id == book_id)
+    return statement.group_by(period, Review.rating).order_by(period, Review.rating)
+
+
+async def cached_report(info, key: tuple, build: Callable, ttl: int, scalar: bool = False):
+    """
+    Runs a report, or returns its result from the analytics cache while it is younger than `ttl` seconds.
+
+    Parameters:
+    - info: The GraphQL resolve info, whose request session runs the report.
+    - key: Identifies the report and every argument it depends on.
+    - build: Called without arguments to build the report's select on a cache miss.
+    - ttl: Seconds the result may be served from the cache; 0 disables caching.
+    - scalar: Optional; the report returns a single value instead of rows.
+    """
+    entry = analytics_cache.get(key)
+    if entry is not None and entry[0] > time.monotonic():
+        return entry[1]
+    async with info.context["db"].session() as db:
+        result = await db.scalar(build()) if scalar else (await db.execute(build())).all()
+    if ttl > 0:
+        analytics_cache.set(key, (time.monotonic() + ttl, result))
+    return result
+
+
+class AnalyticsObject(ObjectType):
+    """
+    Borrowing and review reports, each computed by one aggregate query over the window of the
+    `analytics` field. Reports of windows that ended before the current bucket are cached for
+    ANALYTICS_CLOSED_CACHE_TTL seconds, all others for ANALYTICS_CACHE_TTL.
+    """
+    top_borrowed_books = List(TopBookObject,
+                              take=Argument(Int, required=False, default_value=10,
+                                            description="Number of books per period"))
+    loan_durations = List(LoanDurationObject,
+                          take=Argument(Int, required=False, default_value=20, description="Number of users"))
+    overdue_loans = List(OverdueLoanObject,
+                         take=Argument(Int, required=False, default_value=50, description="Number of records to take"))
+    overdue_count = Int(description="Number of loans past their due date")
+    rating_histogram = List(RatingBucketObject, book_id=Argument(Int, required=False))
+
+    @staticmethod
+    def _window_ttl(window: AnalyticsWindow) -> int:
+        return settings.ANALYTICS_CLOSED_CACHE_TTL if window.closed else settings.ANALYTICS_CACHE_TTL
+
+    @staticmethod
+    async def resolve_top_borrowed_books(root: AnalyticsWindow, info, take):
+        return await cached_report(info, ("top_borrowed_books", *root.key(), take),
+                                   lambda: top_borrowed_books_query(root, take), AnalyticsObject._window_ttl(root))
+
+    @staticmethod
+    async def resolve_loan_durations(root: AnalyticsWindow, info, take):
+        # Loans of a closed window can still be returned, so durations are never cached for long.
+        return await cached_report(info, ("loan_durations", *root.key(), take),
+                                   lambda: loan_durations_query(root, take), settings.ANALYTICS_CACHE_TTL)
+
+    @staticmethod
+    async def resolve_overdue_loans(root: AnalyticsWindow, info, take):
+        return await cached_report(info, ("overdue_loans", date.today(), take),
+                                   lambda: overdue_loans_query(take), settings.ANALYTICS_CACHE_TTL)
+
+    @staticmethod
+    async def resolve_overdue_count(root: AnalyticsWindow, info):
+        return await cached_report(info, ("overdue_count", date.today()),
+                                   overdue_count_query, settings.ANALYTICS_CACHE_TTL, scalar=True)
+
+    @staticmethod
+    async def resolve_rating_histogram(root: AnalyticsWindow, info, book_id=None):
+        return await cached_report(info, ("rating_histogram", *root.key(), book_id),
+                                   lambda: rating_histogram_query(root, book_id), AnalyticsObject._window_ttl(root))
@@ -0,0 +1,268 @@
+import hashlib
+import time
+from inspect import isawaitable
+from typing import Any, Dict, Optional
+
+import orjson
+from graphql import GraphQLError, OperationType, execute, parse, validate
+from graphql.utilities import get_operation_ast
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette_graphene3 import GraphQLApp, _get_operation_from_request
+
+from config import settings
+from gql.cache import document_cache, persisted_queries
+from gql.context import release_context
+from gql.cost import check_cost, estimate_cost
+from gql.response_cache import response_cache
+from gql.tracing import TRACING_HEADER, RequestTrace, TracingMiddleware, current_trace
+
+PERSISTED_QUERY_NOT_FOUND = "PersistedQueryNotFound"
+
+# Session key holding the time until which a client that just wrote reads from the primary.
+PRIMARY_UNTIL_KEY = "primary_until"
+
+
+class LibraryGraphQLApp(GraphQLApp):
+    """
+    GraphQLApp that caches parsed and validated documents and supports Automatic Persisted
+    Queries, so clients can send a sha256 hash instead of the full query text. Hash-only
+    queries can also be sent as GET requests, which CDNs are able to cache. When the response
+    cache is enabled, results of read-only queries are served from it until a write invalidates them.
+    Operations are rejected before execution when their estimated depth or cost is over the limits,
+    and the estimate is reported under `extensions.cost`. All resolvers of an operation share the
+    request's session, which is closed once the operation has run; queries read from a replica
+    when there is one, unless the client wrote within DB_READ_YOUR_WRITES_SECONDS or the result is
+    going to be cached. When tracing is enabled, requests carrying
+    the X-Debug-Tracing header get their resolver and SQL timings back under `extensions.tracing`.
+    """
+
+    async def _get_on_get(self, request: Request) -> Optional[Response]:
+        if "extensions" in request.query_params or "query" in request.query_params:
+            try:
+                operation = {
+                    "query": request.query_params.get("query"),
+                    "operationName": request.query_params.get("operationName"),
+                    "variables": orjson.loads(request.query_params.get("variables") or "null"),
+                    "extensions": orjson.loads(request.query_params.get("extensions") or "null"),
+                }
+            except orjson.JSONDecodeError:
+                return JSONResponse({"errors": ["Query parameters are not valid JSON"]}, status_code=400)
+            return await self._execute_operation(request, operation, read_only=True)
+        return await super()._get_on_get(request)
+
+    async def _handle_http_request(self, request: Request) -> Response:
+        try:
+            operations = await _get_operation_from_request(request)
+        except ValueError as e:
+            return JSONResponse({"errors": [e.args[0]]}, status_code=400)
+
+        if isinstance(operations, list):
+            return JSONResponse(
+                {"errors": ["This server does not support batching"]}, status_code=400
+            )
+        return await self._execute_operation(request, operations)
+
+    def _resolve_query_text(self, operation: Dict[str, Any]) -> str:
+        """
+        Returns the query text of an operation, registering or looking it up as a persisted query
+        when the client sent a `persistedQuery` extension.
+        """
+        query = operation.get("query")
+        persisted = ((operation.get("extensions") or {}).get("persistedQuery") or {})
+        query_hash = persisted.get("sha256Hash")
+        if not query_hash:
+            if not query:
+                raise GraphQLError("Must provide query string.")
+            return query
+
+        if query:
+            if hashlib.sha256(query.encode()).hexdigest() != query_hash:
+                raise GraphQLError("provided sha does not match query")
+            persisted_queries.set(query_hash, query)
+            return query
+
+        query = persisted_queries.get(query_hash)
+        if query is None:
+            raise GraphQLError(PERSISTED_QUERY_NOT_FOUND, extensions={"code": "PERSISTED_QUERY_NOT_FOUND"})
+        return query
+
+    def _get_document(self, query: str):
+        """
+        Parses and validates a query, reusing the cached document when the same text was seen before.
+
+        Returns:
+        - A (document, errors) tuple; only documents without validation errors are cached.
+        """
+        key = hashlib.sha256(query.encode()).hexdigest()
+        document = document_cache.get(key)
+        if document is not None:
+            return document, []
+
+        try:
+            document = parse(query)
+        except GraphQLError as error:
+            return None, [error]
+        errors = validate(self.schema.graphql_schema, document)
+        if errors:
+            return None, errors
+        document_cache.set(key, document)
+        return document, []
+
+    def _error_response(self, errors, status_code: int = 200, extensions: dict = None) -> JSONResponse:
+        response = {"data": None, "errors": [self.error_formatter(error) for error in errors]}
+        if extensions:
+            response["extensions"] = extensions
+        return JSONResponse(response, status_code=status_code)
+
+    async def _execute_operation(self, request: Request, operation: Dict[str, Any],
+                                 read_only: bool = False) -> Response:
+        try:
+            query = self._resolve_query_text(operation)
+        except GraphQLError as error:
+            return self._error_response([error])
+
+        document, errors = self._get_document(query)
+        if errors:
+            return self._error_response(errors)
+
+        operation_name = operation.get("operationName")
+        operation_ast = get_operation_ast(document, operation_name)
+        if read_only and operation_ast is not None and operation_ast.operation != OperationType.QUERY:
+            return self._error_response(
+                [GraphQLError("Can only perform a query operation from a GET request.")], status_code=405)
+        if operation_ast is not None and operation_ast.operation == OperationType.SUBSCRIPTION:
+            return self._error_response(
+                [GraphQLError("Subscriptions are only supported over websockets.")], status_code=400)
+
+        variables = operation.get("variables")
+        extensions = {}
+        if operation_ast is not None:
+            estimate = estimate_cost(self.schema.graphql_schema, document, operation_ast, variables)
+            if estimate is not None:
+                extensions["cost"] = estimate
+                try:
+                    check_cost(estimate)
+                except GraphQLError as error:
+                    return self._error_response([error], extensions=extensions)
+
+        trace = None
+        if settings.TRACING_ENABLED and request.headers.get(TRACING_HEADER):
+            trace = RequestTrace()
+
+        cache_key = None
+        if settings.RESPONSE_CACHE_ENABLED and trace is None:
+            cache_plan = response_cache.plan(self.schema.graphql_schema, query, document, operation_ast)
+            if cache_plan is not None:
+                cache_key = await response_cache.key(cache_plan, variables)
+        if cache_key is not None:
+            cached = await response_cache.get(cache_key)
+            if cached is not None:
+                return self._json_response(cached, read_only)
+
+        context_value = await self._get_context_value(request)
+        db = context_value.get("db")
+        is_query = operation_ast is not None and operation_ast.operation == OperationType.QUERY
+        if db is not None and is_query:
+            # A replica may not have replayed a write whose invalidation the cache key already includes,
+            # so results that are going to be cached are read from the primary.
+            db.use_query_transaction(replica=cache_key is None and not self._pinned_to_primary(request))
+
+        middleware = self.middleware
+        if trace is not None:
+            middleware = [TracingMiddleware(trace), *(self.middleware or [])]
+            trace_token = current_trace.set(trace)
+        try:
+            result = execute(
+                self.schema.graphql_schema,
+                document,
+                root_value=self.root_value,
+                context_value=context_value,
+                variable_values=variables,
+                operation_name=operation_name,
+                middleware=middleware,
+                execution_context_class=self.execution_context_class,
+            )
+            if isawaitable(result):
+                result = await result
+        finally:
+            if db is not None:
+                await db.close()
+            if trace is not None:
+                current_trace.reset(trace_token)
+
+        response: Dict[str, Any] = {"data": result.data}
+        if result.errors:
+            for error in result.errors:
+                if error.original_error:
+                    self.logger.error(
+                        "An exception occurred in resolvers",
+                        exc_info=error.original_error,
+                    )
+            response["errors"] = [
+                self.error_formatter(error) for error in result.errors
+            ]
+        if not is_query and not result.errors and settings.DB_READ_YOUR_WRITES_SECONDS:
+            request.session[PRIMARY_UNTIL_KEY] = time.time() + settings.DB_READ_YOUR_WRITES_SECONDS
+        if trace is not None:
+            extensions["tracing"] = trace.to_extension()
+        if extensions:
+            response["extensions"] = extensions
+
+        content = orjson.dumps(response)
+        if cache_key is not None and not result.errors:
+            await response_cache.set(cache_key, content)
+        return self._json_response(content, read_only and not result.errors,
+                                   background=context_value.get("background"))
+
+    def _check_ws_cost(self, document, variable_values, operation_name) -> list:
+        """
+        Applies the depth and cost limits to an operation sent over the websocket, like to those sent over HTTP.
+
+        Returns:
+        - The errors to send back as GQL_ERROR instead of running the operation, if any.
+        """
+        operation_ast = get_operation_ast(document, operation_name)
+        if operation_ast is None:
+            return []
+        estimate = estimate_cost(self.schema.graphql_schema, document, operation_ast, variable_values)
+        if estimate is None:
+            return []
+        try:
+            check_cost(estimate)
+        except GraphQLError as error:
+            return [error]
+        return []
+
+    async def _handle_query_over_ws(self, websocket, operation_id, document, context_value,
+                                    variable_values, operation_name):
+        try:
+            errors = self._check_ws_cost(document, variable_values, operation_name)
+            if errors:
+                return errors
+            return await super()._handle_query_over_ws(
+                websocket, operation_id, document, context_value, variable_values, operation_name)
+        finally:
+            await release_context(context_value)
+
+    async def _start_subscription(self, websocket, operation_id, subscriptions, document, context_value,
+                                  variable_values, operation_name):
+        errors = self._check_ws_cost(document, variable_values, operation_name)
+        if errors:
+            return errors
+        return await super()._start_subscription(
+            websocket, operation_id, subscriptions, document, context_value, variable_values, operation_name)
+
+    @staticmethod
+    def _pinned_to_primary(request: Request) -> bool:
+        if not settings.DB_READ_YOUR_WRITES_SECONDS or "session" not in request.scope:
+            return False
+        return request.session.get(PRIMARY_UNTIL_KEY, 0) > time.time()
+
+    @staticmethod
+    def _json_response(content: bytes, cacheable: bool, background=None) -> Response:
+        headers = {}
+        if cacheable and settings.APQ_GET_MAX_AGE:
+            headers["Cache-Control"] = f"public, max-age={settings.APQ_GET_MAX_AGE}"
+        return Response(content, status_code=200, headers=headers,
+                         media_type="application/json", background=background)
@@ -0,0 +1,45 @@
+from collections import OrderedDict
+
+from config import settings
+
+
+class LRUCache:
+    """
+    Size-bounded mapping that evicts the least recently used entry and counts hits and misses.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        if key not in self._data:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._data.move_to_end(key)
+        return self._data[key]
+
+    def set(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+# Parsed and validated documents, keyed by the sha256 of the query text.
+document_cache = LRUCache(settings.DOCUMENT_CACHE_SIZE)
+
+# Automatic persisted queries: query text keyed by its sha256 hash.
+persisted_queries = LRUCache(settings.APQ_CACHE_SIZE)
+
+# Selects of the list fields keyed by their shape, executed with each request's values as bound parameters.
+statement_cache = LRUCache(settings.STATEMENT_CACHE_SIZE)
+
+# Results of analytics reports with their expiry, keyed by report, window and arguments.
+analytics_cache = LRUCache(settings.ANALYTICS_CACHE_SIZE)
@@ -0,0 +1,28 @@
+from starlette.background import BackgroundTasks
+from starlette.requests import HTTPConnection
+from db import RequestSession, sessionmanager
+from gql.loaders import create_loaders
+
+
+def get_context(request: HTTPConnection) -> dict:
+    """
+    Builds the GraphQL context for a single request, including the session shared by all of
+    its resolvers and its own set of DataLoaders.
+    """
+    db = RequestSession(sessionmanager)
+    return {
+        "request": request,
+        "background": BackgroundTasks(),
+        "db": db,
+        "loaders": create_loaders(db),
+    }
+
+
+async def release_context(context: dict):
+    """
+    Closes the context's session and empties its loader caches, for contexts that outlive a
+    single operation (websocket operations and subscriptions).
+    """
+    await context["db"].close()
+    for loader in context["loaders"].values():
+        loader.clear_all()
@@ -0,0 +1,98 @@
+from graphql import (FieldNode, FragmentDefinitionNode, FragmentSpreadNode, GraphQLError, GraphQLList,
+                     get_named_type, get_nullable_type)
+from graphql.execution.values import get_argument_values, get_variable_values
+
+from config import settings
+
+# Fields that cost more than the default of 1 per object field (scalar fields are free).
+FIELD_COSTS = {
+    "UserConnection.totalCount": 10,
+    "BookConnection.totalCount": 10,
+    "BurrowConnection.totalCount": 10,
+}
+
+# Arguments that bound the number of items a list field returns.
+SIZE_ARGUMENTS = ("take", "first")
+
+
+def estimate_cost(schema, document, operation, variables) -> dict:
+    """
+    Estimates how expensive an operation is before it runs. Every object field costs 1 (or its
+    FIELD_COSTS entry) and the cost of a list's children is multiplied by its `take`/`first`
+    argument, or by GRAPHQL_DEFAULT_LIST_SIZE for unbounded nested lists.
+
+    Parameters:
+    - schema: The GraphQL schema.
+    - document: The parsed and validated document.
+    - operation: The operation definition to be executed.
+    - variables: The raw variable values sent by the client.
+
+    Returns:
+    - A dict with the estimated `cost` and the selection `depth`, or None if the variables are invalid
+      (execution reports those errors itself).
+    """
+    coerced = get_variable_values(schema, operation.variable_definitions or [], variables or {})
+    if isinstance(coerced, list):
+        return None
+    fragments = {definition.name.value: definition for definition in document.definitions
+                 if isinstance(definition, FragmentDefinitionNode)}
+    root_type = schema.get_root_type(operation.operation)
+    cost, depth = _selection_cost(schema, root_type, operation.selection_set, fragments, coerced)
+    return {"cost": cost, "depth": depth, "maxCost": settings.GRAPHQL_MAX_COST, "maxDepth": settings.GRAPHQL_MAX_DEPTH}
+
+
+def check_cost(estimate: dict):
+    """
+    Raises a GraphQLError when an estimate exceeds the configured depth or cost limits.
+    """
+    if estimate["depth"] > settings.GRAPHQL_MAX_DEPTH:
+        raise GraphQLError(
+            f"Query depth {estimate['depth']} exceeds the maximum of {settings.GRAPHQL_MAX_DEPTH}",
+            extensions={"code": "QUERY_TOO_DEEP"})
+    if estimate["cost"] > settings.GRAPHQL_MAX_COST:
+        raise GraphQLError(
+            f"Query cost {estimate['cost']} exceeds the maximum of {settings.GRAPHQL_MAX_COST}",
+            extensions={"code": "QUERY_TOO_COMPLEX"})
+
+
+def _selection_cost(schema, parent_type, selection_set, fragments, variables):
+    cost, depth = 0, 0
+    for selection in selection_set.selections:
+        if isinstance(selection, FieldNode):
+            field_cost, field_depth = _field_cost(schema, parent_type, selection, fragments, variables)
+        else:
+            if isinstance(selection, FragmentSpreadNode):
+                fragment = fragments[selection.name.value]
+                type_condition, fragment_selections = fragment.type_condition, fragment.selection_set
+            else:
+                type_condition, fragment_selections = selection.type_condition, selection.selection_set
+            fragment_type = schema.get_type(type_condition.name.value) if type_condition else parent_type
+            field_cost, field_depth = _selection_cost(schema, fragment_type, fragment_selections, fragments, variables)
+        cost += field_cost
+        depth = max(depth, field_depth)
+    return cost, depth
+
+
+def _field_cost(schema, parent_type, node: FieldNode, fragments, variables):
+    name = node.name.value
+    if name.startswith("__"):
+        return 0, 0
+    if node.selection_set is None:
+        return FIELD_COSTS.get(f"{parent_type.name}.{name}", 0), 0
+
+    field = parent_type.fields[name]
+    field_type = get_named_type(field.type)
+    child_cost, child_depth = _selection_cost(schema, field_type, node.selection_set, fragments, variables)
+
+    arguments = get_argument_values(field, node, variables)
+    size = next((arguments[argument] for argument in SIZE_ARGUMENTS if arguments.get(argument) is not None), None)
+    if size is None and isinstance(get_nullable_type(field.type), GraphQLList):
+        # Connection edges are already bounded by the connection's `first`.
+        if name == "edges" and parent_type.name.endswith("Connection"):
+            size = 1
+        else:
+            size = settings.GRAPHQL_DEFAULT_LIST_SIZE
+    size = max(size if size is not None else 1, 0)
+
+    own_cost = FIELD_COSTS.get(f"{parent_type.name}.{name}", 1)
+    return own_cost + size * child_cost, 1 + child_depth
@@ -0,0 +1,63 @@
+from graphene import Boolean, Date, DateTime, InputObjectType, Int, List, String
+from sqlalchemy import types
+
+from models import User, Book, BorrowRecord
+
+# Columns of each model that clients may filter and order by. Anything else, e.g. users.password, is rejected.
+FILTER_COLUMNS = {
+    User: ("id", "email", "first_name", "last_name", "birth_date", "is_active", "created_at"),
+    Book: ("id", "title", "author", "serial_number", "date_published", "publisher", "created_at"),
+    BorrowRecord: ("id", "user_id", "book_id", "due_date", "return_date", "created_at"),
+}
+
+# GraphQL scalar of each column type.
+SCALARS = (
+    (types.Boolean, Boolean),
+    (types.DateTime, DateTime),
+    (types.Date, Date),
+    (types.Integer, Int),
+    (types.String, String),
+)
+
+# Operators available on every column that isn't a boolean.
+RANGE_OPERATORS = ("gt", "gte", "lt", "lte")
+
+
+def _scalar(column):
+    return next(scalar for column_type, scalar in SCALARS if isinstance(column.type, column_type))
+
+
+def filter_input_type(name: str, model):
+    """
+    Builds the `where` input type of a model. Every whitelisted column gets an equality field and
+    `_in` and `_is_null` fields; non-boolean columns also get `_gt`, `_gte`, `_lt`, `_lte` and
+    `_between`, and string columns `_prefix`. `AND` and `OR` take lists of nested filters.
+
+    Parameters:
+    - name: Name of the GraphQL input type.
+    - model: The SQLAlchemy model whose FILTER_COLUMNS are exposed.
+    """
+    fields = {
+        "and_": List(lambda: input_type, name="AND", description="All of these filters must match"),
+        "or_": List(lambda: input_type, name="OR", description="At least one of these filters must match"),
+    }
+    for column_name in FILTER_COLUMNS[model]:
+        column = getattr(model, column_name)
+        scalar = _scalar(column)
+        fields[column_name] = scalar()
+        fields[f"{column_name}_in"] = List(scalar)
+        fields[f"{column_name}_is_null"] = Boolean()
+        if scalar is not Boolean:
+            for operator in RANGE_OPERATORS:
+                fields[f"{column_name}_{operator}"] = scalar()
+            fields[f"{column_name}_between"] = List(scalar, description="Inclusive lower and upper bound")
+        if scalar is String:
+            fields[f"{column_name}_prefix"] = String()
+
+    input_type = type(name, (InputObjectType,), fields)
+    return input_type
+
+
+UserFilter = filter_input_type("UserFilter", User)
+BookFilter = filter_input_type("BookFilter", Book)
+BorrowFilter = filter_input_type("BorrowFilter", BorrowRecord)
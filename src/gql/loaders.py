@@ -0,0 +1,52 @@
+from collections import defaultdict
+from graphene.utils.dataloader import DataLoader
+from sqlalchemy.future import select
+from db import RequestSession
+from models import User, BorrowRecord, Book, Review
+
+
+class ModelLoader(DataLoader):
+    """
+    Batches every lookup of a model by a single column that happens within one
+    resolver level into a single `IN (...)` query.
+
+    Parameters:
+    - model: The SQLAlchemy model to load.
+    - column: The model column the keys are matched against.
+    - db: The request's shared session.
+    - many: Optional; resolve each key to a list of rows instead of a single row.
+    """
+
+    def __init__(self, model, column, db: RequestSession, many: bool = False):
+        super().__init__()
+        self.db = db
+        self.model = model
+        self.column = column
+        self.many = many
+
+    async def batch_load_fn(self, keys):
+        async with self.db.session() as db:
+            result = await db.execute(select(self.model).filter(self.column.in_(set(keys))).order_by(self.model.id))
+            rows = result.scalars().all()
+
+        if self.many:
+            grouped = defaultdict(list)
+            for row in rows:
+                grouped[getattr(row, self.column.key)].append(row)
+            return [grouped.get(key, []) for key in keys]
+
+        by_key = {getattr(row, self.column.key): row for row in rows}
+        return [by_key.get(key) for key in keys]
+
+
+def create_loaders(db: RequestSession) -> dict:
+    """
+    Builds a fresh set of loaders on the request's session. Called once per request so cached
+    rows never leak between requests.
+    """
+    return {
+        "user": ModelLoader(User, User.id, db),
+        "book": ModelLoader(Book, Book.id, db),
+        "borrow_records_by_user": ModelLoader(BorrowRecord, BorrowRecord.user_id, db, many=True),
+        "reviews_by_user": ModelLoader(Review, Review.user_id, db, many=True),
+    }
@@ -1,11 +1,21 @@
-from contextlib import asynccontextmanager
+from collections import Counter, defaultdict
+from datetime import date, datetime
 
-from graphene import Mutation, String, Int, Float, Date, Field , ObjectType
+from graphene import (Mutation, String, Int, Float, Date, Field , ObjectType, Enum, InputObjectType, List,
+                      Argument)
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.future import select
 
 from config import settings
-from db import get_db_session
-from gql.types import BookObject
-from models import Book
+from gql.response_cache import response_cache
+from gql.subscriptions import availability_payloads, publish_borrow_events
+from gql.types import BookObject, BurrowObject, ItemError
+from models import Book, BorrowRecord, BookStats, User, stored_columns
+from models.stats import stats_delta_statement
+
+# Rows per multi-row INSERT, which keeps every statement well under the bind parameter limit of asyncpg.
+INSERT_CHUNK_SIZE = 1000
 
 
 class AddBook(Mutation):
@@ -21,15 +31,217 @@ class AddBook(Mutation):
 
     @staticmethod
     async def mutate(root, info, **kwargs):
-        async with asynccontextmanager(get_db_session)() as db:
+        async with info.context["db"].session() as db:
             book = Book(**kwargs)
             db.add(book)
             await db.commit()
             await db.refresh(book)
-            return AddBook(book=book)
+        await response_cache.invalidate(Book.__tablename__)
+        return AddBook(book=book)
+
+
+class SerialNumberConflict(Enum):
+    """
+    What addBooks does with a book whose serial number already exists.
+    """
+    ERROR = "error"
+    SKIP = "skip"
+    UPDATE = "update"
+
+
+class BookInput(InputObjectType):
+    title = String(required=True)
+    author = String(required=True)
+    serial_number = String(required=True)
+    date_published = Date(required=True)
+    pages = String(required=True)
+    publisher = String(required=True)
+
+
+class BorrowRecordInput(InputObjectType):
+    user_id = Int(required=True)
+    book_id = Int(required=True)
+    due_date = Date(required=True)
+    borrow_note = String()
+
+
+def check_batch_size(items: list):
+    if len(items) > settings.BULK_MUTATION_MAX_ITEMS:
+        raise Exception(f"At most {settings.BULK_MUTATION_MAX_ITEMS} items can be written at once")
+
+
+def validate_lengths(model, index: int, values: dict, errors: list) -> bool:
+    """
+    Checks string values against the length of their column, adding an ItemError for every value that is too long.
+    """
+    valid = True
+    for key, value in values.items():
+        length = getattr(model.__table__.c[key].type, 'length', None)
+        if isinstance(value, str) and length and len(value) > length:
+            errors.append(ItemError(index=index, field=key, message=f"Must be at most {length} characters"))
+            valid = False
+    return valid
+
+
+def chunked(rows: list):
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        yield rows[start:start + INSERT_CHUNK_SIZE]
+
+
+class AddBooks(Mutation):
+    """
+    Inserts a list of books with multi-row INSERT ... RETURNING statements in a single transaction.
+    Items that fail validation or conflict on serial_number are reported in `errors` by position.
+    """
+    class Arguments:
+        books = List(BookInput, required=True)
+        on_conflict = Argument(SerialNumberConflict, default_value=SerialNumberConflict.ERROR.value)
+
+    books = List(BookObject)
+    errors = List(ItemError)
+
+    @staticmethod
+    async def mutate(root, info, books, on_conflict=SerialNumberConflict.ERROR.value):
+        check_batch_size(books)
+        errors, rows = [], {}
+        for index, book in enumerate(books):
+            values = dict(book)
+            if not validate_lengths(Book, index, values, errors):
+                continue
+            if values['serial_number'] in rows:
+                errors.append(ItemError(index=index, field='serial_number', message="Duplicate serial_number in this batch"))
+                continue
+            rows[values['serial_number']] = (index, values)
+
+        inserted = []
+        async with info.context["db"].session() as db:
+            for chunk in chunked([values for _, values in rows.values()]):
+                statement = insert(Book.__table__).values(chunk)
+                if on_conflict == SerialNumberConflict.UPDATE.value:
+                    statement = statement.on_conflict_do_update(
+                        index_elements=[Book.serial_number],
+                        set_={**{key: statement.excluded[key] for key in BookInput._meta.fields},
+                              'updated_at': datetime.now()},
+                    )
+                else:
+                    statement = statement.on_conflict_do_nothing(index_elements=[Book.serial_number])
+                result = await db.execute(statement.returning(*stored_columns(Book.__table__)))
+                inserted.extend(result.all())
+            await db.commit()
+
+        written = {row.serial_number for row in inserted}
+        if on_conflict == SerialNumberConflict.ERROR.value:
+            errors.extend(
+                ItemError(index=index, field='serial_number', message="A book with this serial_number already exists")
+                for serial_number, (index, _) in rows.items() if serial_number not in written
+            )
+        if inserted:
+            await response_cache.invalidate(Book.__tablename__)
+        return AddBooks(books=sorted(inserted, key=lambda row: rows[row.serial_number][0]),
+                        errors=sorted(errors, key=lambda error: error.index))
+
+
+class CreateBorrowRecords(Mutation):
+    """
+    Creates a list of borrow records with multi-row INSERT ... RETURNING statements in a single transaction,
+    after checking in bulk that their users and books exist.
+    """
+    class Arguments:
+        records = List(BorrowRecordInput, required=True)
+
+    records = List(BurrowObject)
+    errors = List(ItemError)
+
+    @staticmethod
+    async def mutate(root, info, records):
+        check_batch_size(records)
+        errors, rows, inserted = [], [], []
+        async with info.context["db"].session() as db:
+            user_ids = set(await db.scalars(
+                select(User.id).filter(User.id.in_({record.user_id for record in records}))))
+            book_ids = set(await db.scalars(
+                select(Book.id).filter(Book.id.in_({record.book_id for record in records}))))
+            for index, record in enumerate(records):
+                values = dict(record)
+                if not validate_lengths(BorrowRecord, index, values, errors):
+                    continue
+                if values['user_id'] not in user_ids:
+                    errors.append(ItemError(index=index, field='user_id', message="User does not exist"))
+                elif values['book_id'] not in book_ids:
+                    errors.append(ItemError(index=index, field='book_id', message="Book does not exist"))
+                else:
+                    rows.append(values)
+
+            for chunk in chunked(rows):
+                result = await db.execute(
+                    insert(BorrowRecord.__table__).values(chunk).returning(*BorrowRecord.__table__.columns))
+                inserted.extend(result.all())
+            # Core INSERTs bypass the ORM events that maintain book_stats.
+            if inserted:
+                borrows = Counter(row.book_id for row in inserted)
+                await db.execute(stats_delta_statement(
+                    {book_id: {'borrow_count': count} for book_id, count in borrows.items()}))
+                availability = await availability_payloads(db, borrows)
+            await db.commit()
+
+        if inserted:
+            await response_cache.invalidate(BorrowRecord.__tablename__, BookStats.__tablename__)
+            await publish_borrow_events(inserted, availability)
+        return CreateBorrowRecords(records=inserted, errors=errors)
+
+
+class ReturnBooks(Mutation):
+    """
+    Marks a list of open borrow records as returned with a single UPDATE ... RETURNING.
+    """
+    class Arguments:
+        ids = List(Int, required=True)
+        return_date = Date(description="Defaults to today")
+
+    records = List(BurrowObject)
+    errors = List(ItemError)
+
+    @staticmethod
+    async def mutate(root, info, ids, return_date=None):
+        check_batch_size(ids)
+        return_date = return_date or date.today()
+        async with info.context["db"].session() as db:
+            result = await db.execute(
+                update(BorrowRecord.__table__)
+                .where(BorrowRecord.id.in_(set(ids)), BorrowRecord.return_date.is_(None))
+                .values(return_date=return_date)
+                .returning(*BorrowRecord.__table__.columns)
+            )
+            returned = result.all()
+            # Core UPDATEs bypass the ORM events that maintain book_stats.
+            if returned:
+                deltas = defaultdict(lambda: {'returned_count': 0, 'borrowed_days_sum': 0})
+                for row in returned:
+                    deltas[row.book_id]['returned_count'] += 1
+                    if row.created_at is not None:
+                        deltas[row.book_id]['borrowed_days_sum'] += (return_date - row.created_at.date()).days
+                await db.execute(stats_delta_statement(deltas))
+                availability = await availability_payloads(db, deltas)
+            await db.commit()
+
+        returned_ids, errors, seen = {row.id for row in returned}, [], set()
+        for index, record_id in enumerate(ids):
+            if record_id in seen:
+                errors.append(ItemError(index=index, field='id', message="Duplicate id in this batch"))
+            elif record_id not in returned_ids:
+                errors.append(ItemError(index=index, field='id',
+                                        message="Borrow record does not exist or was already returned"))
+            seen.add(record_id)
+        if returned:
+            await response_cache.invalidate(BorrowRecord.__tablename__, BookStats.__tablename__)
+            await publish_borrow_events([], availability)
+        return ReturnBooks(records=returned, errors=errors)
 
 
 class Mutation(ObjectType):
     add_book=AddBook.Field()
+    add_books = AddBooks.Field()
+    create_borrow_records = CreateBorrowRecords.Field()
+    return_books = ReturnBooks.Field()
 
-MUTATE = {"mutation":Mutation} if settings.ADD_MUTATION == 1 else {}
\ No newline at end of file
+MUTATE = {"mutation":Mutation} if settings.ADD_MUTATION == 1 else {}
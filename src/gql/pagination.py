@@ -0,0 +1,64 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, datetime
+
+import orjson
+from graphene.relay import PageInfo
+
+
+def encode_cursor(value, row_id: int) -> str:
+    """
+    Builds an opaque cursor from the ordering column value and the row id used as a tiebreaker.
+    """
+    return urlsafe_b64encode(orjson.dumps([value, row_id])).decode()
+
+
+def decode_cursor(cursor: str, column):
+    """
+    Reverses `encode_cursor`, restoring the ordering value to the python type of the given column.
+
+    Returns:
+    - A (value, row_id) tuple.
+    """
+    try:
+        value, row_id = orjson.loads(urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ValueError(f"Invalid cursor '{cursor}'")
+    python_type = column.type.python_type
+    if value is not None and python_type is datetime:
+        value = datetime.fromisoformat(value)
+    elif value is not None and python_type is date:
+        value = date.fromisoformat(value)
+    return value, row_id
+
+
+def build_connection(connection_type, rows, first: int, after, order_key: str, count_query):
+    """
+    Wraps a keyset page in a Relay connection.
+
+    Parameters:
+    - connection_type: The graphene Connection class to build.
+    - rows: The fetched rows; one more than `first` signals a next page.
+    - first: The requested page size.
+    - after: The cursor the page started after, if any.
+    - order_key: Name of the attribute the page is ordered by.
+    - count_query: A count select, only executed if the client asks for totalCount.
+
+    Returns:
+    - An instance of `connection_type`.
+    """
+    has_next_page = len(rows) > first
+    edges = [
+        connection_type.Edge(node=row, cursor=encode_cursor(getattr(row, order_key), row.id))
+        for row in rows[:first]
+    ]
+    connection = connection_type(
+        edges=edges,
+        page_info=PageInfo(
+            has_next_page=has_next_page,
+            has_previous_page=after is not None,
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+        ),
+    )
+    connection.count_query = count_query
+    return connection
@@ -0,0 +1,43 @@
+from graphql import FieldNode, FragmentSpreadNode, InlineFragmentNode
+from graphene.utils.str_converters import to_snake_case
+
+
+def _collect_field_nodes(info, selection_sets) -> list:
+    """
+    Flattens the given selection sets into their field nodes, following named and inline fragments.
+    """
+    field_nodes = []
+
+    def collect(selection_set):
+        if selection_set is None:
+            return
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                field_nodes.append(selection)
+            elif isinstance(selection, FragmentSpreadNode):
+                collect(info.fragments[selection.name.value].selection_set)
+            elif isinstance(selection, InlineFragmentNode):
+                collect(selection.selection_set)
+
+    for selection_set in selection_sets:
+        collect(selection_set)
+    return field_nodes
+
+
+def selected_fields(info, path: tuple = ()) -> set:
+    """
+    Collects the fields requested under the field being resolved, following
+    named and inline fragments.
+
+    Parameters:
+    - info: The GraphQL resolve info of the current field.
+    - path: Optional; snake_case field names to descend through first, e.g. ('edges', 'node') for connections.
+
+    Returns:
+    - A set of snake_case field names as they are declared on the graphene types.
+    """
+    field_nodes = _collect_field_nodes(info, [node.selection_set for node in info.field_nodes])
+    for name in path:
+        field_nodes = _collect_field_nodes(info, [node.selection_set for node in field_nodes
+                                                  if to_snake_case(node.name.value) == name])
+    return {to_snake_case(node.name.value) for node in field_nodes if not node.name.value.startswith('__')}
@@ -0,0 +1,213 @@
+import asyncio
+import contextlib
+import importlib
+import logging
+from collections import defaultdict
+from typing import AsyncIterator, Callable, List, Optional
+
+import orjson
+from sqlalchemy import text
+
+from config import settings
+from db import sessionmanager
+
+logger = logging.getLogger(__name__)
+
+BOOK_AVAILABILITY_CHANGED = "book_availability_changed"
+BORROW_RECORD_CREATED = "borrow_record_created"
+CHANNELS = (BOOK_AVAILABILITY_CHANGED, BORROW_RECORD_CREATED)
+
+
+class InProcessBackend:
+    """
+    Delivers published events straight to the subscribers of this process.
+    """
+
+    async def start(self, deliver: Callable):
+        self._deliver = deliver
+
+    async def stop(self):
+        pass
+
+    async def publish(self, channel: str, payloads: List[dict]):
+        for payload in payloads:
+            self._deliver(channel, payload)
+
+
+class PostgresNotifyBackend:
+    """
+    Publishes events with NOTIFY and delivers them from a LISTEN connection, so subscribers
+    connected to any worker or host receive events published by any other one.
+    Notifications sent inside a transaction are only delivered once it commits.
+
+    The LISTEN connection is pinged every `check_interval` seconds. When it is closed or stops
+    answering (a dropped connection, a failover), a new one is opened and listens again, retrying
+    with backoff. Events published while no connection was listening are not delivered.
+    """
+
+    def __init__(self, check_interval: float = None):
+        self._check_interval = check_interval or settings.PUBSUB_LISTEN_CHECK_INTERVAL
+        self._connection = None
+        self._driver_connection = None
+        self._lost = asyncio.Event()
+        self._watch_task: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: Callable):
+        self._deliver = deliver
+        await self._listen()
+        self._watch_task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._watch_task
+            self._watch_task = None
+        await self._close()
+
+    async def _listen(self):
+        self._lost.clear()
+        self._connection = await sessionmanager.engine.connect()
+        raw_connection = await self._connection.get_raw_connection()
+        self._driver_connection = raw_connection.driver_connection
+        self._driver_connection.add_termination_listener(self._on_termination)
+        for channel in CHANNELS:
+            await self._driver_connection.add_listener(channel, self._on_notification)
+
+    async def _close(self):
+        if self._connection is None:
+            return
+        connection, self._connection, self._driver_connection = self._connection, None, None
+        # Invalidated rather than returned to the pool, which must not hand out a listening connection.
+        with contextlib.suppress(Exception):
+            await connection.invalidate()
+        with contextlib.suppress(Exception):
+            await connection.close()
+
+    async def _alive(self) -> bool:
+        try:
+            await asyncio.wait_for(self._driver_connection.execute("SELECT 1"), self._check_interval)
+            return True
+        except Exception:
+            return False
+
+    async def _watch(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._lost.wait(), self._check_interval)
+            except asyncio.TimeoutError:
+                if await self._alive():
+                    continue
+            logger.warning("Lost the LISTEN connection, subscriptions get no events until it is reopened")
+            await self._close()
+            delay = 1
+            while True:
+                try:
+                    await self._listen()
+                    break
+                except Exception:
+                    logger.exception("Reopening the LISTEN connection failed, retrying in %ss", delay)
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 30)
+            logger.info("Reopened the LISTEN connection")
+
+    def _on_termination(self, connection):
+        if connection is self._driver_connection:
+            self._lost.set()
+
+    def _on_notification(self, connection, pid, channel, payload):
+        self._deliver(channel, orjson.loads(payload))
+
+    async def publish(self, channel: str, payloads: List[dict]):
+        async with sessionmanager.connect() as connection:
+            await connection.execute(
+                text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"),
+                {"channel": channel, "payloads": [orjson.dumps(payload).decode() for payload in payloads]},
+            )
+
+
+class Subscriber:
+    """
+    Queue of the events one subscription has not consumed yet. When a slow client falls
+    QUEUE_SIZE events behind, the oldest ones are dropped rather than blocking the publisher.
+    """
+
+    def __init__(self, predicate: Optional[Callable[[dict], bool]]):
+        self.predicate = predicate
+        self.queue = asyncio.Queue(maxsize=settings.SUBSCRIPTION_QUEUE_SIZE)
+
+    def put(self, payload: dict):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(payload)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        return await self.queue.get()
+
+
+class Broker:
+    """
+    Fans published events out to the subscribers of each channel. Subscribers register a predicate
+    so events they filter out are never queued and don't wake their coroutine.
+    """
+
+    def __init__(self, backend_factory: Callable):
+        self._backend_factory = backend_factory
+        self._backend = None
+        self._subscribers = defaultdict(set)
+
+    @property
+    def backend(self):
+        # Created on first use, once the number of workers serving the app is known.
+        if self._backend is None:
+            self._backend = self._backend_factory()
+        return self._backend
+
+    async def start(self):
+        await self.backend.start(self._deliver)
+
+    async def stop(self):
+        await self.backend.stop()
+
+    def _deliver(self, channel: str, payload: dict):
+        for subscriber in self._subscribers[channel]:
+            if subscriber.predicate is None or subscriber.predicate(payload):
+                subscriber.put(payload)
+
+    async def publish(self, channel: str, payloads: List[dict]):
+        """
+        Publishes a list of events to a channel. Payloads have to be JSON serializable.
+        """
+        if payloads:
+            await self.backend.publish(channel, payloads)
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, channel: str, predicate: Optional[Callable[[dict], bool]] = None
+                        ) -> AsyncIterator[Subscriber]:
+        subscriber = Subscriber(predicate)
+        self._subscribers[channel].add(subscriber)
+        try:
+            yield subscriber
+        finally:
+            self._subscribers[channel].discard(subscriber)
+
+    def stats(self) -> dict:
+        return {channel: len(subscribers) for channel, subscribers in self._subscribers.items()}
+
+
+def _create_backend():
+    backend = settings.PUBSUB_BACKEND
+    if backend == "auto":
+        backend = "postgres" if settings.WEB_CONCURRENCY > 1 else "memory"
+    if backend == "memory":
+        return InProcessBackend()
+    if backend == "postgres":
+        return PostgresNotifyBackend()
+    module_name, _, class_name = backend.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+broker = Broker(_create_backend)
@@ -1,11 +1,16 @@
-from contextlib import asynccontextmanager
-from graphene import ObjectType, List, Field, Argument, Boolean, String, Int
-from db import get_db_session
-from gql.types import UserObject, BookObject, BurrowObject
-from models import User, BorrowRecord, Book, Review
+from graphene import ObjectType, List, Field, Argument, Boolean, String, Int, DateTime
+from config import settings
+from gql.analytics import AnalyticsObject, AnalyticsWindow
+from gql.cache import statement_cache
+from gql.filters import FILTER_COLUMNS, UserFilter, BookFilter, BorrowFilter
+from gql.pagination import build_connection, decode_cursor
+from gql.planner import selected_fields
+from gql.types import UserObject, BookObject, BurrowObject, UserConnection, BookConnection, BurrowConnection
+from models import User, BorrowRecord, Book, BookStats, apply_book_search, hot_since
 from sqlalchemy.future import select
-from sqlalchemy.orm import noload, joinedload
-from sqlalchemy import asc, desc, func, inspect, Date, case
+from sqlalchemy.orm import load_only
+from sqlalchemy import (asc, desc, func, inspect, Date, tuple_, cast, Numeric, and_, or_, bindparam,
+                        Integer, String as StringType)
 
 class ModelMapper:
     """
@@ -36,6 +41,26 @@ class ModelMapper:
         "id_in": Book.id,
     }
 
+    # Model behind each mapper, whose FILTER_COLUMNS can also be filtered with operator suffixes.
+    MAPPER_MODELS = {
+        "USER_MAPPER": User,
+        "BORROW_MAPPER": BorrowRecord,
+        "BOOK_MAPPER": Book,
+    }
+
+    # Builds the expression of a `<column>_<operator>` filter from the column and the bound parameter(s)
+    # of its value. `is_null` has no parameter, whether it matches nulls is part of the filter's shape.
+    FILTER_OPERATORS = {
+        "in": lambda column, value: column.in_(value),
+        "gt": lambda column, value: column > value,
+        "gte": lambda column, value: column >= value,
+        "lt": lambda column, value: column < value,
+        "lte": lambda column, value: column <= value,
+        "between": lambda column, value: column.between(*value),
+        "is_null": lambda column, value: column.is_(None) if value else column.isnot(None),
+        "prefix": lambda column, value: column.like(value, escape='\\'),
+    }
+
     @staticmethod
     def apply_pagination(query, skip=None, take=None):
         """
@@ -55,44 +80,350 @@ class ModelMapper:
             query = query.limit(take)
         return query
 
+    @staticmethod
+    def order_column(model, order: str):
+        """
+        Returns the model column an order string refers to, rejecting columns outside FILTER_COLUMNS.
+        """
+        column_name = order[1:] if order.startswith('-') else order
+        if column_name not in FILTER_COLUMNS[model]:
+            raise ValueError(f"Cannot order by '{column_name}'")
+        return getattr(model, column_name)
+
+    @staticmethod
+    def apply_keyset_pagination(query, model, order: str, first: int, after: str = None):
+        """
+        Applies keyset pagination to a SQLAlchemy query, ordering by the given column with the
+        primary key as a tiebreaker so deep pages are an index range scan instead of an OFFSET.
+        Nulls of a nullable column sort after every value, as they do in a Postgres index, and
+        are paged through by id.
+
+        Parameters:
+        - query: The SQLAlchemy query to modify.
+        - model: The model the query selects from.
+        - order: Column name to order by, prefixed with '-' for descending.
+        - first: Number of records to return; one extra row is fetched to detect a next page.
+        - after: Optional; cursor of the last record of the previous page.
+
+        Returns:
+        - The modified query with ordering, the cursor condition and a limit applied.
+        """
+        column = ModelMapper.order_column(model, order)
+        descending = order.startswith('-')
+        nullable = column.nullable
+
+        if after is not None:
+            value, row_id = decode_cursor(after, column)
+            if value is None and nullable:
+                # The previous page ended among the nulls, which never compare to a row value.
+                after_id = model.id < row_id if descending else model.id > row_id
+                condition = and_(column.is_(None), after_id)
+                if descending:
+                    condition = or_(condition, column.isnot(None))
+            else:
+                position, bound = tuple_(column, model.id), tuple_(value, row_id)
+                condition = position < bound if descending else position > bound
+                if nullable and not descending:
+                    condition = or_(condition, column.is_(None))
+            query = query.filter(condition)
+
+        if descending:
+            query = query.order_by(desc(column).nulls_first() if nullable else desc(column), desc(model.id))
+        else:
+            query = query.order_by(asc(column).nulls_last() if nullable else asc(column), asc(model.id))
+        return query.limit(first + 1)
+
+    @classmethod
+    def list_query(cls, query, mapper_name: str, query_params: dict, order: str, skip=None, take=None):
+        """
+        Applies the filters, ordering and offset pagination of a list to a select. Shared by the
+        GraphQL list fields and the REST list routes so both issue the same query.
+
+        Parameters:
+        - query: The select to modify, of the model behind the mapper.
+        - mapper_name: Name of the mapper the filters are read with (e.g., 'USER_MAPPER').
+        - query_params: Dictionary of query parameters for filtering.
+        - order: Column name to order by, prefixed with '-' for descending.
+        - skip: Optional; number of records to skip (offset) for pagination.
+        - take: Optional; number of records to take (limit) for pagination.
+
+        Returns:
+        - The modified query.
+        """
+        query = query.filter(*cls.get_filter_exp(query_params, mapper_name)).order_by(
+            cls.ordering(order, cls.MAPPER_MODELS[mapper_name]))
+        return cls.apply_pagination(query, skip, take)
+
+    @classmethod
+    def cached_list_query(cls, key, build, mapper_name: str, query_params: dict, order: str = None,
+                          skip=None, take=None):
+        """
+        Returns the statement of a list together with the values to execute it with.
+
+        The statement only depends on the shape of the request: `key`, which filters are given
+        (not their values), the ordering and whether it is paginated. It is built on the first request
+        of each shape with bound parameters in place of the values and kept in the statement cache,
+        so later requests skip building the select, and with it generating its cache key, and go
+        straight to SQLAlchemy's compiled cache and the connection's prepared statement.
+
+        Parameters:
+        - key: Hashable identity of what `build` selects, e.g. the field name and the requested columns.
+        - build: Called without arguments to build the unfiltered select on a cache miss.
+        - mapper_name: Name of the mapper the filters are read with (e.g., 'USER_MAPPER').
+        - query_params: Dictionary of query parameters for filtering.
+        - order: Optional; column name to order by, prefixed with '-' for descending.
+        - skip: Optional; number of records to skip (offset) for pagination.
+        - take: Optional; number of records to take (limit) for pagination.
+
+        Returns:
+        - The statement and the dict of bound parameter values to pass to `execute`.
+        """
+        model = cls.MAPPER_MODELS[mapper_name]
+        shape, values = cls.filter_shape(query_params, mapper_name)
+        cache_key = (key, mapper_name, shape, order, skip is not None, take is not None)
+        statement = statement_cache.get(cache_key)
+        if statement is None:
+            statement = build().filter(*cls.shape_exp(shape, model))
+            if order is not None:
+                statement = statement.order_by(cls.ordering(order, model))
+            statement = cls.apply_pagination(statement,
+                                             None if skip is None else bindparam("skip", type_=Integer),
+                                             None if take is None else bindparam("take", type_=Integer))
+            statement_cache.set(cache_key, statement)
+        if skip is not None:
+            values["skip"] = skip
+        if take is not None:
+            values["take"] = take
+        return statement, values
+
+    @staticmethod
+    def count_query(model, filter_expressions: list):
+        """
+        Builds the count select behind a connection's totalCount.
+        """
+        return select(func.count()).select_from(model).filter(*filter_expressions)
+
+    @staticmethod
+    def hot_borrow_records(query_params: dict) -> dict:
+        """
+        Pops `include_archived` from the query parameters of a borrow records field and, unless it is set,
+        restricts the loans to the hot window so Postgres only scans the partitions of recent months.
+        """
+        if not query_params.pop('include_archived', False) and settings.BORROW_RECORDS_HOT_MONTHS > 0:
+            query_params['created_at_gte'] = hot_since(settings.BORROW_RECORDS_HOT_MONTHS)
+        return query_params
+
+    @staticmethod
+    def prefix_pattern(column, prefix: str) -> str:
+        """
+        Returns the LIKE pattern matching values of `column` starting with `prefix`. LIKE with a constant
+        pattern anchored at the start is planned as an index range scan, unlike ILIKE or a leading wildcard.
+        Wildcards in the prefix are escaped.
+        """
+        if not isinstance(column.type, StringType):
+            raise ValueError(f"Cannot match a prefix of '{column.key}'")
+        escaped = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        return f"{escaped}%"
+
     @classmethod
     def get_filter_exp(cls, query_params: dict, mapper_name: str):
         """
         Constructs SQLAlchemy filter expressions based on provided query parameters
         using the specified attribute mapper.
 
+        Besides the mapper's own parameters, every column in FILTER_COLUMNS can be filtered as
+        `<column>` or `<column>_<operator>` with the operators of FILTER_OPERATORS. `where` holds a
+        nested filter, and `and_`/`or_` lists of them that must all or at least one match.
+
         Parameters:
         - query_params: Dictionary of query parameters for filtering.
         - mapper_name: Name of the mapper to use (e.g., 'USER_MAPPER').
 
         Returns:
-        - A list of SQLAlchemy filter expressions.
+        - A list of SQLAlchemy filter expressions, with the values in named bound parameters.
         """
-        filter_expressions = []
+        shape, values = cls.filter_shape(query_params, mapper_name)
+        return cls.shape_exp(shape, cls.MAPPER_MODELS[mapper_name], values)
+
+    @classmethod
+    def filter_shape(cls, query_params: dict, mapper_name: str, prefix: str = ""):
+        """
+        Splits query parameters into the shape of their filters and the values of those filters.
+
+        The shape is a hashable tuple of `(operator, column name, parameter name)` entries, and of
+        `("and_" | "or_", groups)` entries whose groups are shapes themselves. Equal shapes turn into
+        the same SQL, only the values bound to the named parameters differ.
+
+        Parameters:
+        - query_params: Dictionary of query parameters for filtering.
+        - mapper_name: Name of the mapper to use (e.g., 'USER_MAPPER').
+        - prefix: Optional; prepended to the parameter names of nested filters to keep them unique.
+
+        Returns:
+        - The shape and a dict of the values by parameter name.
+        """
+        shape, values = [], {}
         mapper = getattr(cls, mapper_name)  # Dynamically access the mapper based on mapper_name.
+        model = cls.MAPPER_MODELS[mapper_name]
 
         for param, value in query_params.items():
-            if param.endswith("_in") and param in mapper:
+            name = f"{prefix}{param}"
+            if param == "where":
+                nested, nested_values = cls.filter_shape(value or {}, mapper_name, f"{name}_")
+                shape.extend(nested)
+                values.update(nested_values)
+            elif param in ("and_", "or_"):
+                groups = []
+                for index, group in enumerate(value or []):
+                    nested, nested_values = cls.filter_shape(group, mapper_name, f"{name}{index}_")
+                    if nested:
+                        groups.append(nested)
+                        values.update(nested_values)
+                if groups:
+                    shape.append((param, tuple(groups)))
+            elif param.endswith("_in") and param in mapper:
                 # Ensures value is a list for 'in_' operations.
                 if not isinstance(value, list):
                     raise ValueError(f"Expected a list for '{param}' but got '{type(value)}'")
-                filter_expressions.append(mapper[param].in_(value))
-            elif param in mapper:
-                filter_expressions.append(mapper[param] == value)
+                shape.append(("in", mapper[param].key, name))
+                values[name] = value
+            elif param in mapper or param in FILTER_COLUMNS[model]:
+                column = mapper[param] if param in mapper else getattr(model, param)
+                if value is None:
+                    shape.append(("is_null", column.key, True))
+                else:
+                    shape.append(("eq", column.key, name))
+                    values[name] = value
+            elif value is not None:
+                entry = cls.operator_shape(model, param, name, value, values)
+                if entry is not None:
+                    shape.append(entry)
+
+        return tuple(shape), values
+
+    @classmethod
+    def operator_shape(cls, model, param: str, name: str, value, values: dict):
+        """
+        Returns the shape entry of a `<column>_<operator>` parameter and adds its values to `values`,
+        or returns None if the parameter doesn't name a whitelisted column and a known operator.
+        """
+        for operator in cls.FILTER_OPERATORS:
+            column_name = param[:-len(operator) - 1]
+            if param.endswith(f"_{operator}") and column_name in FILTER_COLUMNS[model]:
+                if operator in ("in", "between") and not isinstance(value, list):
+                    raise ValueError(f"Expected a list for '{param}' but got '{type(value)}'")
+                if operator == "between":
+                    if len(value) != 2:
+                        raise ValueError(f"Expected a lower and an upper bound for '{param}'")
+                    values[f"{name}_lower"], values[f"{name}_upper"] = value
+                elif operator == "is_null":
+                    return operator, column_name, bool(value)
+                elif operator == "prefix":
+                    values[name] = cls.prefix_pattern(getattr(model, column_name), value)
+                else:
+                    values[name] = value
+                return operator, column_name, name
+        return None
+
+    @classmethod
+    def shape_exp(cls, shape: tuple, model, values: dict = None):
+        """
+        Builds the filter expressions of a shape returned by `filter_shape`.
+
+        Parameters:
+        - shape: The filter shape.
+        - model: The model the filters apply to.
+        - values: Optional; values of the parameters. Without them the parameters are left unbound,
+          to be supplied when the statement is executed.
+
+        Returns:
+        - A list of SQLAlchemy filter expressions.
+        """
+        def bind(name, column, **kwargs):
+            if values is None:
+                return bindparam(name, type_=column.type, **kwargs)
+            return bindparam(name, values[name], type_=column.type, **kwargs)
 
+        filter_expressions = []
+        for operator, *arguments in shape:
+            if operator in ("and_", "or_"):
+                combine = and_ if operator == "and_" else or_
+                groups = arguments[0]
+                filter_expressions.append(combine(*(and_(*cls.shape_exp(group, model, values)) for group in groups)))
+                continue
+            column_name, name = arguments
+            column = getattr(model, column_name)
+            if operator == "eq":
+                filter_expressions.append(column == bind(name, column))
+                continue
+            if operator == "is_null":
+                value = name
+            elif operator == "in":
+                value = bind(name, column, expanding=True)
+            elif operator == "between":
+                value = (bind(f"{name}_lower", column), bind(f"{name}_upper", column))
+            else:
+                value = bind(name, column)
+            filter_expressions.append(cls.FILTER_OPERATORS[operator](column, value))
         return filter_expressions
+
+    # Columns each relationship field needs on its parent row so its loader can resolve it.
+    RELATION_KEYS = {
+        "user": "user_id",
+        "book": "book_id",
+    }
+
+    # Computed book fields, read from the precomputed book_stats totals.
+    BOOK_AGGREGATES = {
+        # Average rating over all reviews of the book.
+        "readers_avg_rating": func.coalesce(
+            cast(BookStats.rating_sum, Numeric) / func.nullif(BookStats.review_count, 0), 0),
+        # Average number of days returned loans of the book lasted.
+        "average_borrowed_time": func.coalesce(
+            cast(BookStats.borrowed_days_sum, Numeric) / func.nullif(BookStats.returned_count, 0), 0),
+    }
+
+    @classmethod
+    def plan_columns(cls, model, fields: set):
+        """
+        Picks the model columns a query has to load for the requested GraphQL fields.
+
+        Parameters:
+        - model: The SQLAlchemy model being queried.
+        - fields: The requested field names, as returned by `selected_fields`.
+
+        Returns:
+        - A list of model attributes; the primary key and the keys used by requested relations are always included.
+        """
+        required = {"id"} | {key for field, key in cls.RELATION_KEYS.items() if field in fields}
+        return [getattr(model, column.key) for column in inspect(model).column_attrs
+                if column.key in fields or column.key in required]
+
+    @classmethod
+    def book_select(cls, fields: set):
+        """
+        Builds the books select for the requested fields, joining book_stats only when a computed field is requested.
+        """
+        aggregates = [expression.label(name) for name, expression in cls.BOOK_AGGREGATES.items() if name in fields]
+        query = select(*cls.plan_columns(Book, fields), *aggregates)
+        if aggregates:
+            query = query.outerjoin(BookStats, BookStats.book_id == Book.id)
+        return query
+
     @staticmethod
-    def ordering(order: str):
+    def ordering(order: str, model):
         """
         Determines the SQLAlchemy ordering based on the provided string.
 
         Parameters:
         - order: A string indicating the ordering direction and field, prefixed with '-' for descending.
+        - model: The model being ordered; only its FILTER_COLUMNS can be ordered by.
 
         Returns:
         - An SQLAlchemy ordering expression.
         """
-        return desc(order[1:]) if order.startswith('-') else asc(order)
+        column = ModelMapper.order_column(model, order)
+        return desc(column) if order.startswith('-') else asc(column)
 
 class Query(ObjectType):
     """
@@ -106,8 +437,11 @@ class Query(ObjectType):
                  last_name=Argument(String, required=False),
                  email=Argument(String, required=False),
                  id_in=Argument(List(Int), required=False),
-                 limit=Argument(Int, required=False, default_value=100),
-                 offset=Argument(Int, required=False, default_value=1),
+                 where=Argument(UserFilter, required=False),
+                 limit=Argument(Int, required=False, default_value=100,
+                                deprecation_reason="Not applied, use skip/take or usersConnection"),
+                 offset=Argument(Int, required=False, default_value=1,
+                                 deprecation_reason="Not applied, use skip/take or usersConnection"),
                  order_by=Argument(String, required=False, default_value='id'),
                  skip=Argument(Int, required=False, default_value=0, description="Number of records to skip"),
                  take=Argument(Int, required=False, default_value=50, description="Number of records to take"),
@@ -123,6 +457,9 @@ class Query(ObjectType):
     borrows_records = List(BurrowObject,
                            book_id_in=Argument(List(Int), required=False),
                            user_id_in=Argument(List(Int), required=False),
+                           where=Argument(BorrowFilter, required=False),
+                           include_archived=Argument(Boolean, required=False, default_value=False,
+                                                     description="Also return loans older than the hot window"),
                            order_by=Argument(String, required=False, default_value='created_at'),
                            skip=Argument(Int, required=False, default_value=0, description="Number of records to skip"),
                            take=Argument(Int, required=False, default_value=50, description="Number of records to take"),
@@ -133,10 +470,60 @@ class Query(ObjectType):
                  author=Argument(String, required=False),
                  title=Argument(String, required=False),
                  id_in=Argument(List(Int), required=False),
+                 where=Argument(BookFilter, required=False),
                  skip=Argument(Int, required=False,default_value=0, description="Number of records to skip"),
                  take=Argument(Int, required=False, default_value=50,description="Number of records to take"),
                  )
 
+    # Relevance ranked full-text search, tolerant of misspelled words.
+    search_books = List(BookObject,
+                        query=Argument(String, required=True,
+                                       description="Words to look for in the title, author and publisher"),
+                        take=Argument(Int, required=False, default_value=20, description="Number of records to take"),
+                        )
+
+    # Borrowing and review reports over a period, bucketed by day, week, month or year.
+    analytics = Field(AnalyticsObject,
+                      bucket=Argument(String, required=False, default_value='month',
+                                      description="day, week, month or year"),
+                      since=Argument(DateTime, required=False, description="Start of the period"),
+                      until=Argument(DateTime, required=False, description="End of the period, defaults to now"),
+                      )
+
+    # Keyset paginated connections. Cursors stay stable and fast however deep the client pages.
+    users_connection = Field(UserConnection,
+                             is_active=Argument(Boolean, required=False),
+                             first_name=Argument(String, required=False),
+                             last_name=Argument(String, required=False),
+                             email=Argument(String, required=False),
+                             id_in=Argument(List(Int), required=False),
+                             where=Argument(UserFilter, required=False),
+                             order_by=Argument(String, required=False, default_value='id'),
+                             first=Argument(Int, required=False, default_value=50, description="Number of records to take"),
+                             after=Argument(String, required=False, description="Cursor to continue after"),
+                             )
+
+    books_connection = Field(BookConnection,
+                             author=Argument(String, required=False),
+                             title=Argument(String, required=False),
+                             id_in=Argument(List(Int), required=False),
+                             where=Argument(BookFilter, required=False),
+                             order_by=Argument(String, required=False, default_value='id'),
+                             first=Argument(Int, required=False, default_value=50, description="Number of records to take"),
+                             after=Argument(String, required=False, description="Cursor to continue after"),
+                             )
+
+    borrows_records_connection = Field(BurrowConnection,
+                                       book_id_in=Argument(List(Int), required=False),
+                                       user_id_in=Argument(List(Int), required=False),
+                                       where=Argument(BorrowFilter, required=False),
+                                       include_archived=Argument(Boolean, required=False, default_value=False,
+                                                                 description="Also return loans older than the hot window"),
+                                       order_by=Argument(String, required=False, default_value='created_at'),
+                                       first=Argument(Int, required=False, default_value=50, description="Number of records to take"),
+                                       after=Argument(String, required=False, description="Cursor to continue after"),
+                                       )
+
     @staticmethod
     async def resolve_books(root, info, **kwargs):
         """
@@ -146,25 +533,32 @@ class Query(ObjectType):
         """
         skip = kwargs.pop('skip')
         take = kwargs.pop('take')
-        async with asynccontextmanager(get_db_session)() as db:
-            base_query = select(
-                # Dynamically select all Book attributes.
-                *[getattr(Book, column.name) for column in inspect(Book).c],
-                # Calculate the average rating.
-                func.coalesce(func.avg(Review.rating), 0).label('readers_avg_rating'),
-                # Calculate the average borrowed time, treating missing return dates as zero.
-                func.coalesce(func.sum(case(
-                    (BorrowRecord.return_date.isnot(None),
-                     func.cast(BorrowRecord.return_date, Date) - func.cast(BorrowRecord.created_at, Date)),
-                    else_=0)), 0).label('average_borrowed_time')
-            ).outerjoin(Review, Book.id == Review.book_id
-            ).outerjoin(BorrowRecord, Book.id == BorrowRecord.book_id
-            ).filter(*ModelMapper.get_filter_exp(kwargs, 'BOOK_MAPPER')
-            ).group_by(Book.id)
-            paginated_query = ModelMapper.apply_pagination(base_query,skip,take)
-            result = await db.execute(paginated_query)
+        fields = frozenset(selected_fields(info))
+        statement, values = ModelMapper.cached_list_query(
+            ('books', fields), lambda: ModelMapper.book_select(fields), 'BOOK_MAPPER', kwargs, skip=skip, take=take)
+        async with info.context["db"].session() as db:
+            result = await db.execute(statement, values)
             return result.all()
 
+    @staticmethod
+    async def resolve_search_books(root, info, query, take):
+        """
+        Resolves the searchBooks query to fetch the books best matching a free text search, most relevant first.
+        """
+        if not query.strip():
+            return []
+        async with info.context["db"].session() as db:
+            search_query = apply_book_search(ModelMapper.book_select(selected_fields(info)), query, db.bind.dialect.name)
+            result = await db.execute(search_query.limit(take))
+            return result.all()
+
+    @staticmethod
+    def resolve_analytics(root, info, bucket, since=None, until=None):
+        """
+        Resolves the analytics query to the window its reports run over.
+        """
+        return AnalyticsWindow(bucket, since, until)
+
     @staticmethod
     async def resolve_users(root, info, **kwargs):
         """
@@ -173,15 +567,13 @@ class Query(ObjectType):
         order = kwargs.pop('order_by')
         skip = kwargs.pop('skip')
         take = kwargs.pop('take')
-        async with asynccontextmanager(get_db_session)() as db:
-            base_query = select(User).options(
-                joinedload(User.borrow_records_user),
-                joinedload(User.user_reviews)
-            ).filter(*ModelMapper.get_filter_exp(kwargs, 'USER_MAPPER')
-            )
-            paginated_query = ModelMapper.apply_pagination(base_query, skip, take)
-            result = await db.execute(paginated_query.order_by(ModelMapper.ordering(order)))
-            return result.scalars().unique().all()
+        fields = frozenset(selected_fields(info))
+        statement, values = ModelMapper.cached_list_query(
+            ('users', fields), lambda: select(User).options(load_only(*ModelMapper.plan_columns(User, fields))),
+            'USER_MAPPER', kwargs, order, skip, take)
+        async with info.context["db"].session() as db:
+            result = await db.execute(statement, values)
+            return result.scalars().all()
 
     @staticmethod
     async def resolve_user(root, info, **kwargs):
@@ -190,10 +582,9 @@ class Query(ObjectType):
         """
         if not kwargs:
             raise Exception('Either one of id or email should be given')
-        async with asynccontextmanager(get_db_session)() as db:
+        async with info.context["db"].session() as db:
             query = select(User).options(
-                joinedload(User.borrow_records_user),
-                joinedload(User.user_reviews)
+                load_only(*ModelMapper.plan_columns(User, selected_fields(info)))
             ).filter(*[ModelMapper.USER_MAPPER[key] == val for key, val in kwargs.items()])
 
             result = await db.execute(query)
@@ -203,16 +594,76 @@ class Query(ObjectType):
     async def resolve_borrows_records(root, info, **kwargs):
         """
         Resolves the borrows_records query to fetch borrowing records with optional filters and sorting.
+        Archived loans are only included when asked for.
         """
+        ModelMapper.hot_borrow_records(kwargs)
         order = kwargs.pop('order_by')
         skip = kwargs.pop('skip')
         take = kwargs.pop('take')
-        async with asynccontextmanager(get_db_session)() as db:
+        fields = frozenset(selected_fields(info))
+        statement, values = ModelMapper.cached_list_query(
+            ('borrows_records', fields),
+            lambda: select(BorrowRecord).options(load_only(*ModelMapper.plan_columns(BorrowRecord, fields))),
+            'BORROW_MAPPER', kwargs, order, skip, take)
+        async with info.context["db"].session() as db:
+            result = await db.execute(statement, values)
+            return result.scalars().all()
+
+    @staticmethod
+    async def resolve_users_connection(root, info, **kwargs):
+        """
+        Resolves the usersConnection query to fetch a keyset paginated page of users.
+        """
+        order = kwargs.pop('order_by')
+        first = kwargs.pop('first')
+        after = kwargs.pop('after', None)
+        fields = selected_fields(info, ('edges', 'node')) | {order.lstrip('-')}
+        filters = ModelMapper.get_filter_exp(kwargs, 'USER_MAPPER')
+        async with info.context["db"].session() as db:
+            base_query = select(User).options(load_only(*ModelMapper.plan_columns(User, fields))).filter(*filters)
+            paginated_query = ModelMapper.apply_keyset_pagination(base_query, User, order, first, after)
+            result = await db.execute(paginated_query)
+            rows = result.scalars().all()
+        return build_connection(UserConnection, rows, first, after, order.lstrip('-'),
+                                ModelMapper.count_query(User, filters))
+
+    @staticmethod
+    async def resolve_books_connection(root, info, **kwargs):
+        """
+        Resolves the booksConnection query to fetch a keyset paginated page of books,
+        with the computed fields only when they are requested.
+        """
+        order = kwargs.pop('order_by')
+        first = kwargs.pop('first')
+        after = kwargs.pop('after', None)
+        fields = selected_fields(info, ('edges', 'node')) | {order.lstrip('-')}
+        filters = ModelMapper.get_filter_exp(kwargs, 'BOOK_MAPPER')
+        async with info.context["db"].session() as db:
+            base_query = ModelMapper.book_select(fields).filter(*filters)
+            paginated_query = ModelMapper.apply_keyset_pagination(base_query, Book, order, first, after)
+            result = await db.execute(paginated_query)
+            rows = result.all()
+        return build_connection(BookConnection, rows, first, after, order.lstrip('-'),
+                                ModelMapper.count_query(Book, filters))
+
+    @staticmethod
+    async def resolve_borrows_records_connection(root, info, **kwargs):
+        """
+        Resolves the borrowsRecordsConnection query to fetch a keyset paginated page of borrowing records.
+        Archived loans are only included when asked for.
+        """
+        ModelMapper.hot_borrow_records(kwargs)
+        order = kwargs.pop('order_by')
+        first = kwargs.pop('first')
+        after = kwargs.pop('after', None)
+        fields = selected_fields(info, ('edges', 'node')) | {order.lstrip('-')}
+        filters = ModelMapper.get_filter_exp(kwargs, 'BORROW_MAPPER')
+        async with info.context["db"].session() as db:
             base_query = select(BorrowRecord).options(
-                joinedload(BorrowRecord.user),
-                joinedload(BorrowRecord.book)
-            ).filter(*ModelMapper.get_filter_exp(kwargs, 'BORROW_MAPPER')
-            ).order_by(ModelMapper.ordering(order))
-            paginated_query = ModelMapper.apply_pagination(base_query, skip, take)
+                load_only(*ModelMapper.plan_columns(BorrowRecord, fields))
+            ).filter(*filters)
+            paginated_query = ModelMapper.apply_keyset_pagination(base_query, BorrowRecord, order, first, after)
             result = await db.execute(paginated_query)
-            return result.scalars().unique().all()
+            rows = result.scalars().all()
+        return build_connection(BurrowConnection, rows, first, after, order.lstrip('-'),
+                                ModelMapper.count_query(BorrowRecord, filters))
@@ -0,0 +1,192 @@
+import hashlib
+import importlib
+import time
+from typing import Callable, Iterable, List, Optional
+
+import orjson
+from graphql import OperationType, TypeInfo, TypeInfoVisitor, Visitor, get_named_type, print_ast, visit
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from config import settings
+from db import sessionmanager
+from gql.cache import LRUCache
+from models import ResponseCacheVersion
+
+# Tables each GraphQL object type reads from. A write to any of them invalidates cached results containing the type.
+TYPE_TABLES = {
+    "UserObject": {"users"},
+    "BookObject": {"books", "book_stats"},
+    "BurrowObject": {"borrow_records"},
+    "ReviewObject": {"reviews"},
+    "TopBookObject": {"borrow_records"},
+    "LoanDurationObject": {"borrow_records"},
+    "OverdueLoanObject": {"borrow_records"},
+    "RatingBucketObject": {"reviews"},
+    # Covers scalar reports like overdueCount, which have no object type of their own.
+    "AnalyticsObject": {"borrow_records", "reviews"},
+}
+
+# Root query fields whose results may be cached.
+CACHEABLE_FIELDS = {
+    "users", "user", "books", "borrowsRecords", "searchBooks", "analytics",
+    "usersConnection", "booksConnection", "borrowsRecordsConnection",
+}
+
+
+class InMemoryCacheBackend:
+    """
+    Process local cache backend. Its tag versions are only bumped by the mutations of the same process,
+    so it can't be used by several workers. Other backends have to provide the same four coroutines
+    and can be selected with the RESPONSE_CACHE_BACKEND setting.
+    """
+
+    def __init__(self, maxsize: int):
+        self._entries = LRUCache(maxsize)
+        self._versions = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            return None
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        self._entries.set(key, (time.monotonic() + ttl, value))
+
+    async def get_versions(self, tags: List[str]) -> List[int]:
+        return [self._versions.get(tag, 0) for tag in tags]
+
+    async def bump_versions(self, tags: Iterable[str]):
+        for tag in tags:
+            self._versions[tag] = self._versions.get(tag, 0) + 1
+
+    def stats(self) -> dict:
+        return self._entries.stats()
+
+
+class PostgresCacheBackend(InMemoryCacheBackend):
+    """
+    Keeps results in the process like InMemoryCacheBackend, but their tag versions in the
+    response_cache_versions table of the primary. A mutation on any worker or host therefore
+    invalidates the results cached by every other one, at the price of one indexed read per
+    cacheable query.
+    """
+
+    async def get_versions(self, tags: List[str]) -> List[int]:
+        async with sessionmanager.connect() as connection:
+            versions = dict((await connection.execute(
+                select(ResponseCacheVersion.tag, ResponseCacheVersion.version)
+                .filter(ResponseCacheVersion.tag.in_(tags)))).all())
+        return [versions.get(tag, 0) for tag in tags]
+
+    async def bump_versions(self, tags: Iterable[str]):
+        # Sorted, so concurrent mutations lock the rows in the same order.
+        statement = insert(ResponseCacheVersion).values([{"tag": tag, "version": 1} for tag in sorted(set(tags))])
+        statement = statement.on_conflict_do_update(
+            index_elements=[ResponseCacheVersion.tag], set_={"version": ResponseCacheVersion.version + 1})
+        async with sessionmanager.connect() as connection:
+            await connection.execute(statement)
+
+
+class ResponseCache:
+    """
+    Caches the JSON result of read-only GraphQL operations, keyed by the normalized operation and its variables.
+
+    Every entry is tagged with the tables its types read from. Invalidating a tag bumps its version, and
+    since the versions of an operation's tags are part of its key, older entries are simply never read again.
+    """
+
+    def __init__(self, backend_factory: Callable, ttl: int):
+        self._backend_factory = backend_factory
+        self._backend = None
+        self.ttl = ttl
+        # Normalized hash and tags per query text, so the document is only walked once.
+        self._plans = LRUCache(settings.DOCUMENT_CACHE_SIZE)
+
+    @property
+    def backend(self):
+        # Created on first use, once the number of workers serving the app is known.
+        if self._backend is None:
+            self._backend = self._backend_factory()
+        return self._backend
+
+    def plan(self, schema, query: str, document, operation) -> Optional[tuple]:
+        """
+        Returns the (normalized operation hash, tags) of an operation, or None if it must not be cached.
+        """
+        if operation is None or operation.operation != OperationType.QUERY:
+            return None
+        plan_key = hashlib.sha256(query.encode()).hexdigest() + (operation.name.value if operation.name else "")
+        plan = self._plans.get(plan_key)
+        if plan is None:
+            root_fields = {selection.name.value for selection in operation.selection_set.selections
+                           if hasattr(selection, "name")}
+            if not root_fields or not root_fields <= CACHEABLE_FIELDS:
+                plan = (None, None)
+            else:
+                normalized = f"{print_ast(document)}#{operation.name.value if operation.name else ''}"
+                plan = (hashlib.sha256(normalized.encode()).hexdigest(),
+                        sorted(_operation_tables(schema, document)))
+            self._plans.set(plan_key, plan)
+        return plan if plan[0] is not None else None
+
+    async def key(self, plan: tuple, variables) -> str:
+        """
+        Returns the cache key of an operation under the current versions of its tags. It has to be taken
+        before the operation runs and used for both `get` and `set`: a write invalidating a tag while the
+        operation runs then leaves its result under the old version, where it is never read.
+        """
+        operation_hash, tags = plan
+        versions = await self.backend.get_versions(tags)
+        variables_json = orjson.dumps(variables or {}, option=orjson.OPT_SORT_KEYS)
+        return hashlib.sha256(
+            operation_hash.encode() + variables_json + orjson.dumps(dict(zip(tags, versions)))
+        ).hexdigest()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.backend.get(key)
+
+    async def set(self, key: str, content: bytes):
+        await self.backend.set(key, content, self.ttl)
+
+    async def invalidate(self, *tables: str):
+        """
+        Drops every cached result that read from any of the given tables.
+        """
+        await self.backend.bump_versions(tables)
+
+
+def _operation_tables(schema, document) -> set:
+    """
+    Collects the tables read by every object type selected anywhere in the document.
+    """
+    tables = set()
+    type_info = TypeInfo(schema)
+
+    class TableCollector(Visitor):
+        def enter_field(self, node, *args):
+            field_type = type_info.get_type()
+            if field_type is not None:
+                tables.update(TYPE_TABLES.get(get_named_type(field_type).name, ()))
+
+    visit(document, TypeInfoVisitor(type_info, TableCollector()))
+    return tables
+
+
+def _create_backend():
+    backend = settings.RESPONSE_CACHE_BACKEND
+    if backend == "auto":
+        backend = "postgres" if settings.WEB_CONCURRENCY > 1 else "memory"
+    if backend == "memory":
+        return InMemoryCacheBackend(settings.RESPONSE_CACHE_SIZE)
+    if backend == "postgres":
+        return PostgresCacheBackend(settings.RESPONSE_CACHE_SIZE)
+    module_name, _, class_name = backend.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+response_cache = ResponseCache(_create_backend, settings.RESPONSE_CACHE_TTL)
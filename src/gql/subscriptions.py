@@ -0,0 +1,114 @@
+from datetime import date, datetime
+
+from graphene import ObjectType, Int, Boolean, Field, List
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+from gql.context import release_context
+from gql.pubsub import BOOK_AVAILABILITY_CHANGED, BORROW_RECORD_CREATED, broker
+from gql.types import BookObject, BurrowObject
+from models import BorrowRecord
+
+
+class BookAvailability(ObjectType):
+    """
+    Open loans of a book; a book is available when none of its loans are open.
+    """
+    book_id = Int()
+    open_loans = Int()
+    available = Boolean()
+    book = Field(BookObject)
+
+    @staticmethod
+    def resolve_available(root, info):
+        return root["open_loans"] == 0
+
+    @staticmethod
+    def resolve_book(root, info):
+        return info.context["loaders"]["book"].load(root["book_id"])
+
+
+async def event_stream(info, channel: str, predicate=None):
+    """
+    Yields the events of a channel that pass the predicate. The subscription's session and loader
+    caches are released once each event has been sent, so idle subscribers hold no connection.
+    """
+    async with broker.subscribe(channel, predicate) as events:
+        try:
+            async for payload in events:
+                yield payload
+                await release_context(info.context)
+        finally:
+            await release_context(info.context)
+
+
+class Subscription(ObjectType):
+    book_availability_changed = Field(BookAvailability, book_ids=List(Int))
+    borrow_record_created = Field(BurrowObject, user_id=Int(), book_id=Int())
+
+    @staticmethod
+    async def subscribe_book_availability_changed(root, info, book_ids=None):
+        """
+        Notifies whenever a book is borrowed or returned, optionally only for the given books.
+        """
+        wanted = set(book_ids) if book_ids else None
+        async for payload in event_stream(info, BOOK_AVAILABILITY_CHANGED,
+                                          lambda event: wanted is None or event["book_id"] in wanted):
+            yield payload
+
+    @staticmethod
+    async def subscribe_borrow_record_created(root, info, user_id=None, book_id=None):
+        """
+        Notifies of every new borrow record, optionally only of the given user or book.
+        """
+        def matches(event):
+            return ((user_id is None or event["user_id"] == user_id)
+                    and (book_id is None or event["book_id"] == book_id))
+
+        async for payload in event_stream(info, BORROW_RECORD_CREATED, matches):
+            yield borrow_record_from_payload(payload)
+
+
+def borrow_record_payload(row) -> dict:
+    return {
+        "id": row.id,
+        "user_id": row.user_id,
+        "book_id": row.book_id,
+        "borrow_note": row.borrow_note,
+        "due_date": row.due_date.isoformat() if row.due_date else None,
+        "return_date": row.return_date.isoformat() if row.return_date else None,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+    }
+
+
+def borrow_record_from_payload(payload: dict) -> BorrowRecord:
+    """
+    Rebuilds a (transient) borrow record from its event, so subscribers don't query it again.
+    """
+    return BorrowRecord(
+        id=payload["id"],
+        user_id=payload["user_id"],
+        book_id=payload["book_id"],
+        borrow_note=payload["borrow_note"],
+        due_date=date.fromisoformat(payload["due_date"]) if payload["due_date"] else None,
+        return_date=date.fromisoformat(payload["return_date"]) if payload["return_date"] else None,
+        created_at=datetime.fromisoformat(payload["created_at"]) if payload["created_at"] else None,
+    )
+
+
+async def availability_payloads(db, book_ids) -> list:
+    """
+    Counts the open loans of the given books, as book availability events.
+    """
+    result = await db.execute(
+        select(BorrowRecord.book_id, func.count(BorrowRecord.id))
+        .filter(BorrowRecord.book_id.in_(set(book_ids)), BorrowRecord.return_date.is_(None))
+        .group_by(BorrowRecord.book_id)
+    )
+    open_loans = dict(result.all())
+    return [{"book_id": book_id, "open_loans": open_loans.get(book_id, 0)} for book_id in sorted(set(book_ids))]
+
+
+async def publish_borrow_events(created: list, availability: list):
+    await broker.publish(BORROW_RECORD_CREATED, [borrow_record_payload(row) for row in created])
+    await broker.publish(BOOK_AVAILABILITY_CHANGED, availability)
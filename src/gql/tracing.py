@@ -0,0 +1,109 @@
+import time
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from inspect import isawaitable
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import settings
+
+# Header a client sends to get the trace of its request back under extensions.tracing.
+TRACING_HEADER = "x-debug-tracing"
+
+current_trace: ContextVar[Optional["RequestTrace"]] = ContextVar("current_trace", default=None)
+
+
+class RequestTrace:
+    """
+    Collects resolver timings and executed SQL statements for one GraphQL request.
+    """
+
+    def __init__(self):
+        self.start_time = datetime.now(timezone.utc)
+        self.start = time.perf_counter_ns()
+        self.resolvers = []
+        self.statements = []
+
+    def offset(self) -> int:
+        return time.perf_counter_ns() - self.start
+
+    def add_resolver(self, info, start_offset: int):
+        self.resolvers.append({
+            "path": info.path.as_list(),
+            "parentType": str(info.parent_type),
+            "fieldName": info.field_name,
+            "returnType": str(info.return_type),
+            "startOffset": start_offset,
+            "duration": self.offset() - start_offset,
+        })
+
+    def add_statement(self, statement: str, start_offset: int):
+        self.statements.append({
+            "statement": statement,
+            "startOffset": start_offset,
+            "duration": self.offset() - start_offset,
+        })
+
+    def to_extension(self) -> dict:
+        """
+        Renders the trace in the Apollo tracing format, with the SQL statements and repeated
+        statement shapes (likely N+1 patterns) added under `sql`.
+        """
+        duration = self.offset()
+        shapes = Counter(statement["statement"] for statement in self.statements)
+        return {
+            "version": 1,
+            "startTime": self.start_time.isoformat(),
+            "endTime": datetime.now(timezone.utc).isoformat(),
+            "duration": duration,
+            "execution": {"resolvers": self.resolvers},
+            "sql": {
+                "count": len(self.statements),
+                "duration": sum(statement["duration"] for statement in self.statements),
+                "statements": self.statements,
+                "nPlusOne": [
+                    {"statement": statement, "count": count}
+                    for statement, count in shapes.items() if count > settings.TRACING_N_PLUS_ONE_THRESHOLD
+                ],
+            },
+        }
+
+
+class TracingMiddleware:
+    """
+    GraphQL middleware that times every resolver into the given trace.
+    """
+
+    def __init__(self, trace: RequestTrace):
+        self.trace = trace
+
+    def resolve(self, next, root, info, **kwargs):
+        start_offset = self.trace.offset()
+        result = next(root, info, **kwargs)
+        if isawaitable(result):
+            return self._await_result(result, info, start_offset)
+        self.trace.add_resolver(info, start_offset)
+        return result
+
+    async def _await_result(self, result, info, start_offset: int):
+        try:
+            return await result
+        finally:
+            self.trace.add_resolver(info, start_offset)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    trace = current_trace.get()
+    if trace is not None:
+        conn.info.setdefault("trace_start_offsets", []).append(trace.offset())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    trace = current_trace.get()
+    if trace is not None and conn.info.get("trace_start_offsets"):
+        trace.add_statement(statement, conn.info["trace_start_offsets"].pop())
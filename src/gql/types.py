@@ -1,5 +1,5 @@
-from graphene import Int,String,Boolean , Date , Field
-from graphene import ObjectType, List
+from graphene import Int,String,Boolean , Date , Field, DateTime, Float
+from graphene import ObjectType, List, relay
 
 
 
@@ -15,11 +15,11 @@ class UserObject(ObjectType):
 
     @staticmethod
     def resolve_borrow_records_user(root,info):
-        return root.borrow_records_user
+        return info.context["loaders"]["borrow_records_by_user"].load(root.id)
 
     @staticmethod
-    async def resolve_user_reviews(root, info):
-        return root.user_reviews
+    def resolve_user_reviews(root, info):
+        return info.context["loaders"]["reviews_by_user"].load(root.id)
 
 class BookObject(ObjectType):
     id= Int()
@@ -39,8 +39,8 @@ class ReviewObject(ObjectType):
     book = Field(lambda:BookObject)
 
     @staticmethod
-    async def resolve_user_review(root, info):
-        return root.book
+    def resolve_book(root, info):
+        return info.context["loaders"]["book"].load(root.book_id)
 
 class BurrowObject(ObjectType):
     id = Int()
@@ -52,8 +52,109 @@ class BurrowObject(ObjectType):
 
     @staticmethod
     def resolve_user(root,info):
-        return root.user
+        return info.context["loaders"]["user"].load(root.user_id)
 
     @staticmethod
-    async def resolve_book(root, info):
-        return root.book
\ No newline at end of file
+    def resolve_book(root, info):
+        return info.context["loaders"]["book"].load(root.book_id)
+
+
+class TopBookObject(ObjectType):
+    """
+    A book among the most borrowed of a period. Books with the same number of loans share a rank.
+    """
+    period = DateTime(description="Start of the period")
+    rank = Int()
+    borrow_count = Int()
+    book_id = Int()
+    book = Field(lambda: BookObject)
+
+    @staticmethod
+    def resolve_book(root, info):
+        return info.context["loaders"]["book"].load(root.book_id)
+
+
+class LoanDurationObject(ObjectType):
+    """
+    How many days the returned loans of a user lasted.
+    """
+    user_id = Int()
+    loans = Int(description="Number of returned loans")
+    average_days = Float()
+    median_days = Float()
+    p90_days = Float(description="90th percentile")
+    user = Field(lambda: UserObject)
+
+    @staticmethod
+    def resolve_user(root, info):
+        return info.context["loaders"]["user"].load(root.user_id)
+
+
+class OverdueLoanObject(ObjectType):
+    """
+    A loan past its due date that has not been returned.
+    """
+    id = Int()
+    due_date = Date()
+    days_overdue = Int()
+    user_id = Int()
+    book_id = Int()
+    user = Field(lambda: UserObject)
+    book = Field(lambda: BookObject)
+
+    @staticmethod
+    def resolve_user(root, info):
+        return info.context["loaders"]["user"].load(root.user_id)
+
+    @staticmethod
+    def resolve_book(root, info):
+        return info.context["loaders"]["book"].load(root.book_id)
+
+
+class RatingBucketObject(ObjectType):
+    """
+    Number of reviews with a rating in a period, and their share of the period's reviews.
+    """
+    period = DateTime(description="Start of the period")
+    rating = Int()
+    count = Int()
+    share = Float()
+
+
+class ItemError(ObjectType):
+    """
+    Why one item of a bulk mutation was not written.
+    """
+    index = Int(description="Position of the item in the input list")
+    field = String()
+    message = String()
+
+
+class CountableConnection(relay.Connection):
+    """
+    Relay connection whose totalCount is only computed when the client selects it.
+    """
+    class Meta:
+        abstract = True
+
+    total_count = Int()
+
+    @staticmethod
+    async def resolve_total_count(root, info):
+        async with info.context["db"].session() as db:
+            return await db.scalar(root.count_query)
+
+
+class UserConnection(CountableConnection):
+    class Meta:
+        node = UserObject
+
+
+class BookConnection(CountableConnection):
+    class Meta:
+        node = BookObject
+
+
+class BurrowConnection(CountableConnection):
+    class Meta:
+        node = BurrowObject
@@ -1,13 +1,26 @@
+import argparse
+import secrets
 from contextlib import asynccontextmanager
 from api.api_router import api_router
 from config import settings
 from db import sessionmanager
-from starlette_graphene3 import GraphQLApp, make_playground_handler
-from random import randint
+from starlette_graphene3 import make_playground_handler
 from starlette.middleware.sessions import SessionMiddleware
 from fastapi import FastAPI
+from graphql import assert_valid_schema
+from sqlalchemy.orm import configure_mappers
 from starlette.middleware.cors import CORSMiddleware
-from gql import gql_schema
+from gql import gql_schema, get_context, LibraryGraphQLApp
+from gql.pubsub import broker
+
+
+def warm_up():
+    """
+    Does the one-off work the first request would otherwise pay for: configuring the SQLAlchemy
+    mappers and validating the GraphQL schema. Both are cached, so calling it again is cheap.
+    """
+    configure_mappers()
+    assert_valid_schema(gql_schema.graphql_schema)
 
 
 @asynccontextmanager
@@ -16,7 +29,18 @@ async def lifespan(app: FastAPI):
     Function that handles startup and shutdown events.
     To understand more, read https://fastapi.tiangolo.com/advanced/events/
     """
+    # Every worker process starts with pools of its own, opened after it was forked
+    sessionmanager.reset_pools()
+    warm_up()
+    # Open pooled connections before serving so the first requests skip connection setup
+    await sessionmanager.warmup(settings.DB_POOL_WARMUP)
+    sessionmanager.start_health_checks(settings.DB_REPLICA_HEALTH_INTERVAL)
+    await broker.start()
+    # /healthz reports ready from here on
+    app.state.ready = True
     yield
+    app.state.ready = False
+    await broker.stop()
     if sessionmanager._engine is not None:
         # Close the DB connection
         await sessionmanager.close()
@@ -29,7 +53,7 @@ app = FastAPI(
 
 app.add_middleware(
     SessionMiddleware,
-    secret_key=f"{randint(1000, 4000)}-secret-string-{randint(1000, 4000)}",
+    secret_key=settings.SESSION_SECRET_KEY or secrets.token_urlsafe(32),
 
 )
 
@@ -45,17 +69,40 @@ if settings.BACKEND_CORS_ORIGINS:
 
 app.include_router(api_router)
 
-app.mount("/", GraphQLApp(
+app.mount("/", LibraryGraphQLApp(
     schema=gql_schema,
-    on_get=make_playground_handler()
+    on_get=make_playground_handler(),
+    context_value=get_context,
 ))
 
 if __name__ == "__main__":
     import uvicorn
+    from server import default_workers, serve
 
-    uvicorn.run(
-        "main:app",
-        host="0.0.0.0",
-        port=settings.SERVER_PORT,
-        reload=settings.RELOAD
-    )
+    parser = argparse.ArgumentParser(description='Serve the library API.')
+    parser.add_argument('--production', action='store_true', help='Serve with preforked workers instead of the development server')
+    parser.add_argument('--workers', type=int, help='Worker processes in production, defaults to WEB_CONCURRENCY or the number of cores',
+                        default=settings.WEB_CONCURRENCY)
+
+    #  python main.py --production --workers 4
+    args = parser.parse_args()
+
+    if args.production:
+        if not settings.SESSION_SECRET_KEY:
+            parser.error("SESSION_SECRET_KEY must be set in production")
+        workers = args.workers or default_workers()
+        if workers > 1 and settings.RESPONSE_CACHE_ENABLED and settings.RESPONSE_CACHE_BACKEND == "memory":
+            parser.error("RESPONSE_CACHE_BACKEND=memory can't be shared by several workers, use postgres or auto")
+        if workers > 1 and settings.PUBSUB_BACKEND == "memory":
+            parser.error("PUBSUB_BACKEND=memory can't reach subscribers of other workers, use postgres or auto")
+        # The "auto" backends are created after the fork and pick the shared ones for several workers
+        settings.WEB_CONCURRENCY = workers
+        serve("main:app", host=settings.SERVER_HOST, port=settings.SERVER_PORT,
+              workers=workers, preload=warm_up)
+    else:
+        uvicorn.run(
+            "main:app",
+            host=settings.SERVER_HOST,
+            port=settings.SERVER_PORT,
+            reload=settings.RELOAD
+        )
@@ -1,4 +1,8 @@
-from .base import Base
+from .base import Base, stored_columns
 
 from .book import Book,BorrowRecord , Review
-from .users import User
\ No newline at end of file
+from .users import User
+from .stats import BookStats
+from .cache import ResponseCacheVersion
+from .search import apply_book_search
+from .partitions import hot_since
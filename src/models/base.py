@@ -22,3 +22,10 @@ class Base(TimestampMixin):
     def __tablename__(cls) -> str:
         return cls.__name__.lower()
 
+
+
+def stored_columns(table) -> list:
+    """
+    Columns of a table without the generated ones, which only exist for the database to index.
+    """
+    return [column for column in table.columns if column.computed is None]
@@ -1,9 +1,12 @@
+import datetime
 from typing import List
 
-from sqlalchemy import Boolean, Column, Integer, String, ForeignKey, Date, Text, CheckConstraint
-from sqlalchemy.orm import relationship, validates, declared_attr , Mapped
+from sqlalchemy import Boolean, Column, Integer, String, ForeignKey, Date, Text, CheckConstraint, Index, Computed
+from sqlalchemy import DateTime, FetchedValue
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, validates, declared_attr , Mapped, deferred
 
-from email_validator import validate_email
 from .base import Base
 
 
@@ -17,8 +20,26 @@ class Book(Base):
     date_published: Mapped[Date] = Column(Date())
     pages: Mapped[str] = Column(String(4))
     publisher: Mapped[str] = Column(String(150))
-    borrow_records: Mapped[List['BorrowRecord']] = relationship('BorrowRecord', uselist=True, lazy='selectin')
-    book_review: Mapped['Review'] = relationship('Review', back_populates='book', lazy='selectin')
+    # Weighted full-text document of the title, author and publisher, maintained by Postgres.
+    search_vector: Mapped[str] = deferred(Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(author, '')), 'B') || "
+        "setweight(to_tsvector('english', coalesce(publisher, '')), 'C')",
+        persisted=True,
+    )))
+    borrow_records: Mapped[List['BorrowRecord']] = relationship('BorrowRecord', uselist=True, lazy='raise')
+    book_review: Mapped['Review'] = relationship('Review', back_populates='book', lazy='raise')
+
+    __table_args__ = (
+        # searchBooks: full-text matches, and trigram matches for misspelled words.
+        Index('ix_books_search_vector', 'search_vector', postgresql_using='gin').ddl_if(dialect='postgresql'),
+        *(Index(f'ix_books_{column}_trgm', column, postgresql_using='gin',
+                postgresql_ops={column: 'gin_trgm_ops'}).ddl_if(dialect='postgresql')
+          for column in ('title', 'author', 'publisher')),
+        # Range filters on the publication date, and `_prefix` filters on the serial number.
+        Index('ix_books_date_published', 'date_published'),
+        Index('ix_books_serial_number_pattern', 'serial_number', postgresql_ops={'serial_number': 'varchar_pattern_ops'}),
+    )
 
 class BaseAssociation(Base):
     __abstract__ = True
@@ -26,7 +47,7 @@ class BaseAssociation(Base):
 
     @declared_attr
     def user_id(cls) -> Mapped[int]:
-        return Column('user_id', Integer, ForeignKey('users.id', ondelete="CASCADE"))
+        return Column('user_id', Integer, ForeignKey('users.id', ondelete="CASCADE"), index=True)
 
     @declared_attr
     def book_id(cls) -> Mapped[int]:
@@ -34,18 +55,34 @@ class BaseAssociation(Base):
 
     @declared_attr
     def user(cls) -> Mapped['User']:
-        return relationship('User', back_populates='borrow_records_user', lazy='selectin')
+        return relationship('User', back_populates='borrow_records_user', lazy='raise')
 
     @declared_attr
     def book(cls) -> Mapped['Book']:
-        return relationship('Book', back_populates='borrow_records', lazy='selectin')
+        return relationship('Book', back_populates='borrow_records', lazy='raise')
 
 class BorrowRecord(BaseAssociation):
     __tablename__ = 'borrow_records'
-    id: Mapped[int] = Column(Integer, primary_key=True)
+    # Numbered by the database, see models/partitions.py.
+    id: Mapped[int] = Column(Integer, primary_key=True, server_default=FetchedValue())
     borrow_note: Mapped[str] = Column(Text())
     due_date: Mapped[Date] = Column(Date())
     return_date: Mapped[Date] = Column(Date(), nullable=True)
+    # The table is partitioned by month of created_at, and Postgres requires the partition key in the primary key.
+    created_at = Column(DateTime(), default=datetime.datetime.now, primary_key=True)
+
+    __table_args__ = (
+        # Borrow history of a book, newest first.
+        Index('ix_borrow_records_book_id_created_at', 'book_id', 'created_at'),
+        # Default ordering of borrowsRecords and its keyset pagination.
+        Index('ix_borrow_records_created_at_id', 'created_at', 'id'),
+        Index('ix_borrow_records_due_date', 'due_date'),
+        # Loans that have not been returned yet, by due date.
+        Index('ix_borrow_records_open_loans', 'due_date', postgresql_where=text('return_date IS NULL')),
+        {'postgresql_partition_by': 'RANGE (created_at)'},
+    )
+    # Rows are still identified by id alone.
+    __mapper_args__ = {'primary_key': [id]}
 
 
 class Review(BaseAssociation):
@@ -57,14 +94,17 @@ class Review(BaseAssociation):
 
     @declared_attr
     def user(cls) -> Mapped['User']:
-        return relationship('User', back_populates='user_reviews', lazy='selectin')
+        return relationship('User', back_populates='user_reviews', lazy='raise')
 
     @declared_attr
     def book(cls) -> Mapped['Book']:
-        return relationship('Book', back_populates='book_review', lazy='selectin')
+        return relationship('Book', back_populates='book_review', lazy='raise')
 
     __allow_unmapped__ = True
     __table_args__ = (
+        Index('ix_reviews_book_id', 'book_id'),
+        # Reviews of a period, for the rating histograms of analytics.
+        Index('ix_reviews_created_at', 'created_at'),
         CheckConstraint('rating >= 1', name='rating_min'),
         CheckConstraint('rating <= 10', name='rating_max'),
     )
@@ -0,0 +1,16 @@
+from sqlalchemy import BigInteger, Column, Integer, String
+from sqlalchemy.orm import Mapped
+
+from .base import Base
+
+
+class ResponseCacheVersion(Base):
+    """
+    Current version of a response cache tag, shared by every worker and host so that a
+    mutation served by any of them invalidates the results cached by all the others.
+    """
+    __tablename__ = 'response_cache_versions'
+    __allow_unmapped__ = True
+    id: Mapped[int] = Column(Integer, primary_key=True)
+    tag: Mapped[str] = Column(String(64), unique=True, nullable=False)
+    version: Mapped[int] = Column(BigInteger, nullable=False, default=0, server_default='0')
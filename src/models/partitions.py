@@ -0,0 +1,170 @@
+import re
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.schema import CreateColumn, PrimaryKeyConstraint
+
+from .book import BorrowRecord
+
+# On Postgres borrow_records is range partitioned by created_at, one partition per month named
+# borrow_records_pYYYY_MM, plus a default partition catching rows outside all of them. Partitions
+# older than the hot window can be flagged as archived, moved to another tablespace or detached.
+PARTITION_NAME = re.compile(r"^borrow_records_p(\d{4})_(\d{2})$")
+DEFAULT_PARTITION = "borrow_records_default"
+
+# Months of partitions a new database is created with, before and after the current one.
+CREATE_MONTHS_BEHIND = 12
+CREATE_MONTHS_AHEAD = 3
+
+
+def month_start(moment) -> date:
+    return date(moment.year, moment.month, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    months = month.year * 12 + month.month - 1 + count
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"borrow_records_p{month:%Y_%m}"
+
+
+def hot_since(months: int, today: Optional[date] = None) -> datetime:
+    """
+    Returns the start of the hot window: the current month and the `months - 1` before it. Queries
+    filtering on created_at from there on only scan the hot partitions.
+    """
+    start = add_months(month_start(today or date.today()), 1 - months)
+    return datetime(start.year, start.month, 1)
+
+
+def list_partitions(connection) -> Dict[date, str]:
+    """
+    Returns the monthly partitions attached to borrow_records, by month.
+    """
+    names = connection.scalars(text(
+        "SELECT child.relname FROM pg_inherits JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE pg_inherits.inhparent = 'borrow_records'::regclass"
+    )).all()
+    partitions = {}
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return dict(sorted(partitions.items()))
+
+
+def create_partitions(connection, first: date, last: date) -> Dict[str, int]:
+    """
+    Creates the missing monthly partitions from the month of `first` through the month of `last`.
+
+    Postgres refuses to create a partition while the default partition holds rows that belong in it,
+    e.g. loans made after the maintenance job stopped running. Those rows are moved out of the default
+    partition first and into the new partition once it exists, all in the caller's transaction.
+
+    Returns:
+    - The number of rows moved out of the default partition, by the name of each partition created.
+    """
+    existing = list_partitions(connection)
+    has_default = connection.scalar(text(f"SELECT to_regclass('{DEFAULT_PARTITION}') IS NOT NULL"))
+    created = {}
+    month = month_start(first)
+    while month <= month_start(last):
+        if month not in existing:
+            name, end = partition_name(month), add_months(month, 1)
+            in_month = f"created_at >= '{month}' AND created_at < '{end}'"
+            moved = None
+            if has_default and connection.scalar(
+                    text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_month})")):
+                connection.exec_driver_sql(f"CREATE TEMPORARY TABLE moved_borrow_records (LIKE {DEFAULT_PARTITION})")
+                moved = connection.exec_driver_sql(
+                    f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE {in_month} RETURNING *) "
+                    f"INSERT INTO moved_borrow_records SELECT * FROM moved").rowcount
+            connection.exec_driver_sql(
+                f"CREATE TABLE {name} PARTITION OF borrow_records FOR VALUES FROM ('{month}') TO ('{end}')")
+            if moved is not None:
+                connection.exec_driver_sql(f"INSERT INTO {name} SELECT * FROM moved_borrow_records")
+                connection.exec_driver_sql("DROP TABLE moved_borrow_records")
+            created[name] = moved or 0
+        month = add_months(month, 1)
+    return created
+
+
+def archive_partitions(connection, before: date, tablespace: Optional[str] = None) -> List[str]:
+    """
+    Flags the rows of every partition that ends before `before` as archived, and moves the
+    partition and its indexes to `tablespace` when given.
+
+    Returns:
+    - The names of the partitions that had rows flagged or were moved.
+    """
+    archived = []
+    for month, name in list_partitions(connection).items():
+        if add_months(month, 1) > before:
+            continue
+        changed = connection.exec_driver_sql(
+            f"UPDATE {name} SET is_archive = true WHERE is_archive IS NOT true").rowcount > 0
+        if tablespace and connection.scalar(text(
+                "SELECT coalesce(tablespace, '') != :tablespace FROM pg_tables WHERE tablename = :name"),
+                {"tablespace": tablespace, "name": name}):
+            connection.exec_driver_sql(f"ALTER TABLE {name} SET TABLESPACE {tablespace}")
+            for index in connection.scalars(text(
+                    "SELECT indexrelid::regclass::text FROM pg_index WHERE indrelid = CAST(:name AS regclass)"),
+                    {"name": name}):
+                connection.exec_driver_sql(f"ALTER INDEX {index} SET TABLESPACE {tablespace}")
+            changed = True
+        if changed:
+            archived.append(name)
+    return archived
+
+
+def detach_partitions(connection, before: date) -> List[str]:
+    """
+    Detaches every partition that ends before `before`. Its rows stay in a table of the same name,
+    which no query of the API reads, until it is dumped and dropped.
+
+    Returns:
+    - The names of the detached partitions.
+    """
+    detached = []
+    for month, name in list_partitions(connection).items():
+        if add_months(month, 1) <= before:
+            connection.exec_driver_sql(f"ALTER TABLE borrow_records DETACH PARTITION {name}")
+            detached.append(name)
+    return detached
+
+
+def default_partition_rows(connection) -> int:
+    """
+    Counts the rows that fell outside every monthly partition.
+    """
+    return connection.scalar(text(f"SELECT count(*) FROM {DEFAULT_PARTITION}"))
+
+
+@event.listens_for(BorrowRecord.__table__, 'after_create')
+def _create_initial_partitions(target, connection, **kw):
+    if connection.dialect.name != 'postgresql':
+        return
+    this_month = month_start(date.today())
+    create_partitions(connection, add_months(this_month, -CREATE_MONTHS_BEHIND),
+                      add_months(this_month, CREATE_MONTHS_AHEAD))
+    connection.exec_driver_sql(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF borrow_records DEFAULT")
+
+
+@compiles(CreateColumn, 'postgresql')
+def _serial_borrow_record_id(element, compiler, **kw):
+    # SQLAlchemy only numbers the id of single column primary keys itself.
+    if element.element is BorrowRecord.__table__.c.id:
+        return "id SERIAL NOT NULL"
+    return compiler.visit_create_column(element, **kw)
+
+
+@compiles(PrimaryKeyConstraint, 'sqlite')
+def _sqlite_borrow_record_key(element, compiler, **kw):
+    # SQLite isn't partitioned, and an INTEGER PRIMARY KEY is numbered automatically.
+    if element.table is BorrowRecord.__table__:
+        return "PRIMARY KEY (id)"
+    return compiler.visit_primary_key_constraint(element, **kw)
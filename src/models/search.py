@@ -0,0 +1,85 @@
+from sqlalchemy import DDL, String, event, func, literal, literal_column, or_, table, column
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.schema import CreateColumn
+
+from .base import Base
+from .book import Book
+
+# Text search configuration the books' search_vector is built with; queries have to use the same one.
+SEARCH_CONFIG = literal_column("'english'::regconfig")
+
+# Columns matched by trigram similarity, so a misspelled word still finds its book.
+FUZZY_COLUMNS = (Book.title, Book.author, Book.publisher)
+
+# Local SQLite backends have no tsvector: the books are mirrored into an FTS5 table instead,
+# kept in sync by triggers, and ranked with bm25 using the same title > author > publisher weights.
+books_fts = table('books_fts', column('rowid'))
+
+SQLITE_FTS_DDL = (
+    "CREATE VIRTUAL TABLE books_fts USING fts5("
+    "title, author, publisher, content='books', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER books_fts_insert AFTER INSERT ON books BEGIN "
+    "INSERT INTO books_fts (rowid, title, author, publisher) VALUES (new.id, new.title, new.author, new.publisher); "
+    "END",
+    "CREATE TRIGGER books_fts_delete AFTER DELETE ON books BEGIN "
+    "INSERT INTO books_fts (books_fts, rowid, title, author, publisher) "
+    "VALUES ('delete', old.id, old.title, old.author, old.publisher); "
+    "END",
+    "CREATE TRIGGER books_fts_update AFTER UPDATE ON books BEGIN "
+    "INSERT INTO books_fts (books_fts, rowid, title, author, publisher) "
+    "VALUES ('delete', old.id, old.title, old.author, old.publisher); "
+    "INSERT INTO books_fts (rowid, title, author, publisher) VALUES (new.id, new.title, new.author, new.publisher); "
+    "END",
+)
+
+event.listen(Base.metadata, 'before_create',
+             DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect='postgresql'))
+for statement in SQLITE_FTS_DDL:
+    event.listen(Book.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+event.listen(Book.__table__, 'before_drop', DDL("DROP TABLE IF EXISTS books_fts").execute_if(dialect='sqlite'))
+
+
+@compiles(CreateColumn, 'sqlite')
+def _skip_search_vector(element, compiler, **kw):
+    # The tsvector expression can't be evaluated by SQLite, which searches books_fts instead.
+    if element.element is Book.__table__.c.search_vector:
+        return None
+    return compiler.visit_create_column(element, **kw)
+
+
+def fts5_query(query: str) -> str:
+    """
+    Turns free text into an FTS5 query matching every word as a prefix, with the words quoted
+    so characters of the FTS5 query syntax in user input are searched for literally.
+    """
+    return " ".join('"{}"*'.format(word.replace('"', '""')) for word in query.split())
+
+
+def apply_book_search(statement, query: str, dialect: str):
+    """
+    Restricts a books select to the books matching a search and orders them by relevance.
+
+    On Postgres a book matches when its search_vector matches the query, or when the query is a
+    close trigram match of a word of its title, author or publisher. Both conditions are served
+    by GIN indexes. Other dialects are expected to be SQLite with the books_fts table.
+
+    Parameters:
+    - statement: A select from the books table.
+    - query: The user's search text.
+    - dialect: Name of the dialect the statement runs on.
+
+    Returns:
+    - The statement with the match condition and the relevance ordering applied.
+    """
+    if dialect != 'postgresql':
+        return statement.join(books_fts, books_fts.c.rowid == Book.id).filter(
+            literal_column('books_fts').bool_op('MATCH')(fts5_query(query))
+        ).order_by(func.bm25(literal_column('books_fts'), 10.0, 5.0, 1.0), Book.id)
+
+    tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, query)
+    phrase = literal(query, String)
+    similarity = func.greatest(*(func.word_similarity(phrase, field) for field in FUZZY_COLUMNS))
+    return statement.filter(or_(
+        Book.search_vector.bool_op('@@')(tsquery),
+        *(phrase.bool_op('<%')(field) for field in FUZZY_COLUMNS),
+    )).order_by((func.ts_rank_cd(Book.search_vector, tsquery) + similarity).desc(), Book.id)
@@ -0,0 +1,165 @@
+from sqlalchemy import Column, Integer, ForeignKey, Date, event, select, func, case, cast
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Mapped, attributes
+
+from .base import Base
+from .book import Book, BorrowRecord, Review
+
+
+class BookStats(Base):
+    """
+    Running review and borrow totals per book, kept up to date as reviews and
+    borrow records are written so reading the averages is a plain indexed join.
+    """
+    __tablename__ = 'book_stats'
+    __allow_unmapped__ = True
+    id: Mapped[int] = Column(Integer, primary_key=True)
+    book_id: Mapped[int] = Column(Integer, ForeignKey('books.id', ondelete="CASCADE"), unique=True, nullable=False)
+    review_count: Mapped[int] = Column(Integer, nullable=False, default=0, server_default='0')
+    rating_sum: Mapped[int] = Column(Integer, nullable=False, default=0, server_default='0')
+    borrow_count: Mapped[int] = Column(Integer, nullable=False, default=0, server_default='0')
+    returned_count: Mapped[int] = Column(Integer, nullable=False, default=0, server_default='0')
+    borrowed_days_sum: Mapped[int] = Column(Integer, nullable=False, default=0, server_default='0')
+
+
+STAT_COLUMNS = ('review_count', 'rating_sum', 'borrow_count', 'returned_count', 'borrowed_days_sum')
+
+
+def apply_stats_delta(connection, book_id, **deltas):
+    """
+    Adds the given deltas to the stats row of a book, creating the row if needed.
+
+    Parameters:
+    - connection: The connection of the flush the change happens in.
+    - book_id: The book whose totals change.
+    - deltas: Amounts to add, keyed by BookStats column name.
+    """
+    if book_id is None or not any(deltas.values()):
+        return
+    connection.execute(stats_delta_statement({book_id: deltas}))
+
+
+def stats_delta_statement(deltas_by_book: dict):
+    """
+    Builds the upsert adding deltas to the stats rows of several books at once, for writes
+    that bypass the ORM events (e.g. bulk INSERTs and UPDATEs).
+
+    Parameters:
+    - deltas_by_book: Deltas keyed by BookStats column name, per book id.
+    """
+    statement = insert(BookStats).values([
+        {"book_id": book_id, **{column: deltas.get(column, 0) for column in STAT_COLUMNS}}
+        for book_id, deltas in deltas_by_book.items()
+    ])
+    return statement.on_conflict_do_update(
+        index_elements=[BookStats.book_id],
+        set_={column: getattr(BookStats, column) + statement.excluded[column] for column in STAT_COLUMNS},
+    )
+
+
+def borrowed_days(record) -> int:
+    """
+    Number of days a returned borrow record was out for; zero while it is still open.
+    """
+    if record.return_date is None or record.created_at is None:
+        return 0
+    return (record.return_date - record.created_at.date()).days
+
+
+def _changed(target, *keys) -> bool:
+    return any(attributes.get_history(target, key).has_changes() for key in keys)
+
+
+def _old_value(target, key):
+    history = attributes.get_history(target, key)
+    if not history.has_changes():
+        return getattr(target, key)
+    return history.deleted[0] if history.deleted else None
+
+
+def _track_previous_value(target, value, oldvalue, initiator):
+    return value
+
+
+# Make sure the replaced value is known at flush time, even when the attribute was expired before the change.
+for tracked_attribute in (Review.book_id, Review.rating, BorrowRecord.book_id, BorrowRecord.return_date):
+    event.listen(tracked_attribute, 'set', _track_previous_value, active_history=True, retval=True)
+
+
+@event.listens_for(Review, 'after_insert')
+def _review_inserted(mapper, connection, target):
+    apply_stats_delta(connection, target.book_id, review_count=1, rating_sum=target.rating or 0)
+
+
+@event.listens_for(Review, 'after_delete')
+def _review_deleted(mapper, connection, target):
+    apply_stats_delta(connection, target.book_id, review_count=-1, rating_sum=-(target.rating or 0))
+
+
+@event.listens_for(Review, 'after_update')
+def _review_updated(mapper, connection, target):
+    if not _changed(target, 'book_id', 'rating'):
+        return
+    old_book_id, old_rating = _old_value(target, 'book_id'), _old_value(target, 'rating')
+    apply_stats_delta(connection, old_book_id, review_count=-1, rating_sum=-(old_rating or 0))
+    apply_stats_delta(connection, target.book_id, review_count=1, rating_sum=target.rating or 0)
+
+
+@event.listens_for(BorrowRecord, 'after_insert')
+def _borrow_record_inserted(mapper, connection, target):
+    apply_stats_delta(connection, target.book_id, borrow_count=1,
+                      returned_count=int(target.return_date is not None), borrowed_days_sum=borrowed_days(target))
+
+
+@event.listens_for(BorrowRecord, 'after_delete')
+def _borrow_record_deleted(mapper, connection, target):
+    apply_stats_delta(connection, target.book_id, borrow_count=-1,
+                      returned_count=-int(target.return_date is not None), borrowed_days_sum=-borrowed_days(target))
+
+
+@event.listens_for(BorrowRecord, 'after_update')
+def _borrow_record_updated(mapper, connection, target):
+    if not _changed(target, 'book_id', 'return_date'):
+        return
+    old_book_id, old_return_date = _old_value(target, 'book_id'), _old_value(target, 'return_date')
+    old_days = (old_return_date - target.created_at.date()).days if old_return_date and target.created_at else 0
+    apply_stats_delta(connection, old_book_id, borrow_count=-1,
+                      returned_count=-int(old_return_date is not None), borrowed_days_sum=-old_days)
+    apply_stats_delta(connection, target.book_id, borrow_count=1,
+                      returned_count=int(target.return_date is not None), borrowed_days_sum=borrowed_days(target))
+
+
+def refresh_book_stats_statement():
+    """
+    Builds the statement that recomputes every book's totals from scratch. Reviews and borrow
+    records are aggregated separately so their rows never multiply each other.
+    """
+    reviews = select(
+        Review.book_id,
+        func.count(Review.id).label('review_count'),
+        func.coalesce(func.sum(Review.rating), 0).label('rating_sum'),
+    ).group_by(Review.book_id).subquery()
+    borrows = select(
+        BorrowRecord.book_id,
+        func.count(BorrowRecord.id).label('borrow_count'),
+        func.count(BorrowRecord.return_date).label('returned_count'),
+        func.coalesce(func.sum(case(
+            (BorrowRecord.return_date.isnot(None),
+             BorrowRecord.return_date - cast(BorrowRecord.created_at, Date)),
+            else_=0)), 0).label('borrowed_days_sum'),
+    ).group_by(BorrowRecord.book_id).subquery()
+
+    totals = select(
+        Book.id,
+        func.coalesce(reviews.c.review_count, 0),
+        func.coalesce(reviews.c.rating_sum, 0),
+        func.coalesce(borrows.c.borrow_count, 0),
+        func.coalesce(borrows.c.returned_count, 0),
+        func.coalesce(borrows.c.borrowed_days_sum, 0),
+    ).outerjoin(reviews, reviews.c.book_id == Book.id).outerjoin(borrows, borrows.c.book_id == Book.id)
+
+    statement = insert(BookStats).from_select(['book_id', *STAT_COLUMNS], totals)
+    return statement.on_conflict_do_update(
+        index_elements=[BookStats.book_id],
+        set_={column: statement.excluded[column] for column in STAT_COLUMNS},
+    )
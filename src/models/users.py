@@ -1,8 +1,7 @@
 from typing import List
 
-from sqlalchemy import Boolean, Column, Integer, String, ForeignKey, Date
+from sqlalchemy import Boolean, Column, Integer, String, ForeignKey, Date, Index
 from sqlalchemy.orm import relationship, validates, Mapped
-from email_validator import validate_email
 from .base import Base
 
 
@@ -17,11 +16,19 @@ class User(Base):
     birth_date: Mapped[Date] = Column(Date())
     is_active: Mapped[bool] = Column(Boolean(), default=True)
 
-    borrow_records_user: Mapped[List['BorrowRecord']] = relationship('BorrowRecord', uselist=True, lazy='selectin')
-    user_reviews: Mapped[List["Review"]] = relationship('Review', uselist=True, lazy='selectin')
+    borrow_records_user: Mapped[List['BorrowRecord']] = relationship('BorrowRecord', uselist=True, lazy='raise')
+    user_reviews: Mapped[List["Review"]] = relationship('Review', uselist=True, lazy='raise')
+
+    __table_args__ = (
+        # `_prefix` filters, which compare byte-wise and can't use the indexes of the default collation.
+        *(Index(f'ix_users_{column}_pattern', column, postgresql_ops={column: 'varchar_pattern_ops'})
+          for column in ('email', 'first_name', 'last_name')),
+    )
 
     @validates('email')
     def validate_email(self, key, email):
+        # Imported on first use, scripts that only read users don't pay for it.
+        from email_validator import validate_email
         try:
             validated_email = validate_email(email, check_deliverability=False).email
         except Exception as e:
@@ -0,0 +1,49 @@
+import argparse
+import sys
+from datetime import date
+
+from sqlalchemy import create_engine
+
+from config import settings
+from models.partitions import (DEFAULT_PARTITION, add_months, archive_partitions, create_partitions,
+                               default_partition_rows, detach_partitions, hot_since, list_partitions, month_start)
+
+parser = argparse.ArgumentParser(description='Create upcoming borrow_records partitions and archive or detach old ones.')
+parser.add_argument('--months_ahead', type=int, help='Months of partitions to create after the current one',
+                    default=settings.BORROW_RECORDS_PARTITIONS_AHEAD)
+parser.add_argument('--archive', action='store_true', help='Flag the loans of partitions older than the hot window as archived')
+parser.add_argument('--archive_tablespace', help='Also move those partitions and their indexes to this tablespace')
+parser.add_argument('--detach_after', type=int, help='Detach partitions older than this many months (0 keeps them)', default=0)
+
+#  python partition_borrow_records.py
+#  python partition_borrow_records.py --archive --archive_tablespace archive --detach_after 36
+args = parser.parse_args()
+
+engine = create_engine(settings.get_sync_connection_url())
+
+
+if __name__ == "__main__":
+    this_month = month_start(date.today())
+    with engine.begin() as connection:
+        # Also fills the months missed while the command wasn't run, whose loans are in the default partition.
+        first = this_month
+        existing = list_partitions(connection)
+        if existing:
+            first = min(first, add_months(max(existing), 1))
+        for name, moved in create_partitions(connection, first, add_months(this_month, args.months_ahead)).items():
+            print(f"Created {name}, moved {moved} borrow records into it from {DEFAULT_PARTITION}." if moved
+                  else f"Created {name}.")
+        if args.archive or args.archive_tablespace:
+            hot_months = settings.BORROW_RECORDS_HOT_MONTHS
+            if hot_months <= 0:
+                sys.exit("BORROW_RECORDS_HOT_MONTHS is 0, every partition is hot.")
+            for name in archive_partitions(connection, hot_since(hot_months).date(), args.archive_tablespace):
+                print(f"Archived {name}.")
+        if args.detach_after > 0:
+            for name in detach_partitions(connection, add_months(this_month, 1 - args.detach_after)):
+                print(f"Detached {name}, its rows are kept in the table of the same name.")
+        outside = default_partition_rows(connection)
+    if outside:
+        # Only rows older than the first partition are left there, the others were moved above.
+        print(f"Warning: {outside} borrow records fall outside every monthly partition, they stay in "
+              f"{DEFAULT_PARTITION} until partitions for their months are created with create_partitions().")
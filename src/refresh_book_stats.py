@@ -0,0 +1,18 @@
+import argparse
+from sqlalchemy import create_engine
+
+from config import settings
+from models.stats import refresh_book_stats_statement
+
+parser = argparse.ArgumentParser(description='Recompute the book_stats totals from reviews and borrow records.')
+
+#  python refresh_book_stats.py
+args = parser.parse_args()
+
+engine = create_engine(settings.get_sync_connection_url())
+
+
+if __name__ == "__main__":
+    with engine.begin() as connection:
+        connection.execute(refresh_book_stats_statement())
+    print("Book stats refreshed.")
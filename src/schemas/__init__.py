@@ -1 +1 @@
-from .user import UserSchema
\ No newline at end of file
+from .user import UserSchema, ReviewSchema
\ No newline at end of file
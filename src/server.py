@@ -0,0 +1,89 @@
+import logging
+import os
+import signal
+import time
+from typing import Callable, Optional
+
+import uvicorn
+
+from config import settings
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def default_workers() -> int:
+    """
+    Number of cores this process may run on, which respects container CPU sets unlike os.cpu_count().
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def serve(app: str, host: str, port: int, workers: int, preload: Optional[Callable[[], None]] = None):
+    """
+    Serves the app with a preforking supervisor.
+
+    The app, and with it the GraphQL schema, is imported and the socket bound once in the supervisor,
+    then `workers` processes are forked and share both. Each worker runs its own event loop (uvloop
+    and httptools when installed) and creates its database pools in the app's lifespan. On SIGTERM or
+    SIGINT the workers stop accepting connections and finish their requests within
+    GRACEFUL_SHUTDOWN_TIMEOUT seconds. Workers that die are replaced.
+
+    Parameters:
+    - app: Import string of the ASGI app, e.g. "main:app".
+    - host: Interface to bind.
+    - port: Port to bind.
+    - workers: Number of worker processes.
+    - preload: Optional; called in the supervisor after the app is imported, so the work it does is
+      shared with every worker instead of repeated after the fork.
+    """
+    config = uvicorn.Config(app, host=host, port=port, timeout_graceful_shutdown=settings.GRACEFUL_SHUTDOWN_TIMEOUT)
+    if workers <= 1 or not hasattr(os, "fork"):
+        uvicorn.Server(config).run()
+        return
+
+    config.load()
+    if preload is not None:
+        preload()
+    sock = config.bind_socket()
+    children = set()
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                uvicorn.Server(config).run(sockets=[sock])
+            finally:
+                os._exit(0)
+        children.add(pid)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    logger.info("Starting %s workers on http://%s:%s", workers, host, port)
+    for _ in range(workers):
+        spawn()
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        children.discard(pid)
+        if not stopping:
+            logger.warning("Worker %s exited with status %s, starting a new one", pid, status)
+            # Don't spin when workers die right after starting, e.g. because the database is unreachable.
+            time.sleep(1)
+            spawn()
+    sock.close()
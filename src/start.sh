@@ -4,8 +4,6 @@
 set -e
 
 # Run Alembic Upgrades
-alembic revision --autogenerate
-
 alembic upgrade head
 
 # Populate database with fake data